@@ -1,44 +1,65 @@
 from crewai import Agent, Task, Crew
 from langchain.tools import Tool
 import os
+import sys
+
+# Add the parent directory to system path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.llm import get_route_llm
+from config.agent_registry import agent_registry, AGENT_VERBOSE
 
 # Define Agents
-class ContentCreationCrew:
-    def __init__(self):
-        # Agent 1: Content Strategist
-        self.content_strategist = Agent(
-            role='Content Strategist',
-            goal='Analyze the description and determine the best content approach for the specified platform',
-            backstory='Experienced digital marketer with expertise in platform-specific content strategies',
-            verbose=True,
-            allow_delegation=False
-        )
+def content_creation_team():
+    """Build the strategist, image creator and copywriter agents used together."""
+    # Agent 1: Content Strategist
+    content_strategist = Agent(
+        role='Content Strategist',
+        goal='Analyze the description and determine the best content approach for the specified platform',
+        backstory='Experienced digital marketer with expertise in platform-specific content strategies',
+        llm=get_route_llm("copy"),
+        verbose=AGENT_VERBOSE,
+        allow_delegation=False
+    )
 
-        # Agent 2: Image Creator
-        self.image_creator = Agent(
-            role='Image Creator',
-            goal='Generate image based on the description and platform requirements',
-            backstory='Creative designer skilled in visual storytelling and image generation',
-            verbose=True,
-            allow_delegation=False
-        )
+    # Agent 2: Image Creator
+    image_creator = Agent(
+        role='Image Creator',
+        goal='Generate image based on the description and platform requirements',
+        backstory='Creative designer skilled in visual storytelling and image generation',
+        llm=get_route_llm("image_description"),
+        verbose=AGENT_VERBOSE,
+        allow_delegation=False
+    )
 
-        # Agent 3: Copywriter
-        self.copywriter = Agent(
-            role='Copywriter',
-            goal='Write platform-specific post text to accompany the image',
-            backstory='Professional writer adept at crafting engaging posts for various social platforms',
-            verbose=True,
-            allow_delegation=False
-        )
+    # Agent 3: Copywriter
+    copywriter = Agent(
+        role='Copywriter',
+        goal='Write platform-specific post text to accompany the image',
+        backstory='Professional writer adept at crafting engaging posts for various social platforms',
+        llm=get_route_llm("copy"),
+        verbose=AGENT_VERBOSE,
+        allow_delegation=False
+    )
+    return content_strategist, image_creator, copywriter
+
+agent_registry.register("content_creation_team", content_creation_team)
+
+class ContentCreationCrew:
+    """Runs the content creation team; the agents come from the shared registry."""
 
-    # Define Tasks
     def create_content(self, description: str, platform: str):
+        with agent_registry.checkout("content_creation_team") as agents:
+            return self._run(agents, description, platform)
+
+    def _run(self, agents, description: str, platform: str):
+        content_strategist, image_creator, copywriter = agents
+
+        # Define Tasks
         # Task 1: Content Strategy
         strategy_task = Task(
             description=f'''Analyze this description: "{description}" and determine the best content approach 
             for {platform}. Specify tone, style, and key elements to include in both image and text.''',
-            agent=self.content_strategist,
+            agent=content_strategist,
             expected_output='Content strategy plan with tone, style, and key elements'
         )
 
@@ -46,7 +67,7 @@ class ContentCreationCrew:
         image_task = Task(
             description=f'''Based on the content strategy, create a description for an image that would 
             effectively convey the message for {platform}. The original description is: "{description}"''',
-            agent=self.image_creator,
+            agent=image_creator,
             expected_output='Detailed image description ready for generation'
         )
 
@@ -54,15 +75,15 @@ class ContentCreationCrew:
         post_task = Task(
             description=f'''Write a {platform}-specific post to accompany the image, based on the content 
             strategy and the original description: "{description}". Adjust tone and style accordingly.''',
-            agent=self.copywriter,
+            agent=copywriter,
             expected_output=f'{platform}-formatted post text'
         )
 
         # Create and run the crew
         crew = Crew(
-            agents=[self.content_strategist, self.image_creator, self.copywriter],
+            agents=[content_strategist, image_creator, copywriter],
             tasks=[strategy_task, image_task, post_task],
-            verbose=2
+            verbose=AGENT_VERBOSE
         )
         
         return crew.kickoff()
@@ -79,11 +100,8 @@ def format_post(platform: str, text: str) -> str:
         return text
 
 # Example Usage
-def image_generator():
-    # Sample description and platform
-    description = "A team of developers working together on an innovative AI project"
-    platform = "LinkedIn"  # Can be changed to Twitter/X, Instagram, etc.
-
+def image_generator(platform: str = "LinkedIn",
+                    description: str = "A team of developers working together on an innovative AI project"):
     # Initialize crew
     content_crew = ContentCreationCrew()
     
@@ -91,9 +109,9 @@ def image_generator():
     result = content_crew.create_content(description, platform)
     
     # Extract results (assuming CrewAI returns results in a structured way)
-    strategy = result.tasks[0].output
-    image_desc = result.tasks[1].output
-    post_text = result.tasks[2].output
+    strategy = result.tasks_output[0].raw
+    image_desc = result.tasks_output[1].raw
+    post_text = result.tasks_output[2].raw
     
     # Format the post
     formatted_post = format_post(platform, post_text)
@@ -105,6 +123,11 @@ def image_generator():
     
     # Note: Actual image generation would require confirmation and an external tool
     print("\nNote: To generate the actual image based on the description above, please confirm.")
+    return {
+        "strategy": strategy,
+        "image_description": image_desc,
+        "post_text": formatted_post
+    }
 
 if __name__ == "__main__":
     image_generator()
\ No newline at end of file
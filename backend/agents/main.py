@@ -4,7 +4,7 @@ import logging
 import traceback
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
 
@@ -12,9 +12,20 @@ from typing import Dict, List, Any, Optional
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import agent modules
-from setup_agent import process_setup_endpoint, SetupRequest
+from setup_agent import process_setup_endpoint, stream_setup, SetupRequest
 from content_planner import generate_content_schedule, ContentStrategyInput
-from config.database import get_user_by_email, store_credentials
+from config.database import close_all
+from config.indexes import bootstrap_indexes
+from config.async_database import get_user_by_email, store_credentials, close_async_client
+from config.llm_cache import get_llm_cache_stats
+from config.crew_executor import get_crew_executor_stats, shutdown_crew_executor
+from config.job_queue import job_queue, serialize_job
+from config.agent_registry import get_agent_registry_stats
+from config.rate_limiter import get_rate_limiter_stats
+from config.resilience import CircuitOpenError, get_resilience_stats
+from config.hedging import get_hedging_stats
+from config.routing import get_route_stats
+from config.async_database import get_latest_job
 
 # Configure logging
 logging.basicConfig(
@@ -52,11 +63,38 @@ class CredentialsRequest(BaseModel):
     credentials: Dict[str, Dict[str, str]]
     posting_email: Optional[str] = None
 
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    progress: float
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
 class HealthResponse(BaseModel):
     status: str
     version: str
     timestamp: str
 
+# Create indexes and verify hot query plans on startup
+@app.on_event("startup")
+async def startup_event():
+    """Bootstrap database indexes and start the job workers."""
+    bootstrap_indexes()
+    job_queue.start()
+
+# Release pooled database connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop job workers and close shared database clients."""
+    await job_queue.stop()
+    shutdown_crew_executor()
+    close_async_client()
+    close_all()
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -78,38 +116,162 @@ async def root():
         "timestamp": datetime.now().isoformat()
     }
 
+# LLM cache statistics endpoint
+@app.get("/metrics/llm_cache")
+async def llm_cache_metrics():
+    """Hit/miss counters of the shared LLM response cache."""
+    return get_llm_cache_stats()
+
+# Crew executor statistics endpoint
+@app.get("/metrics/crew_executor")
+async def crew_executor_metrics():
+    """In-flight crew runs per endpoint."""
+    return get_crew_executor_stats()
+
+@app.get("/metrics/rate_limiter")
+async def rate_limiter_metrics():
+    """Queued and granted LLM calls per priority."""
+    return get_rate_limiter_stats()
+
+@app.get("/metrics/agents")
+async def agent_registry_metrics():
+    """Build and reuse counters of pooled agents."""
+    return get_agent_registry_stats()
+
+@app.get("/metrics/llm_resilience")
+async def llm_resilience_metrics():
+    """Retry, failure and circuit breaker counters of LLM calls."""
+    return get_resilience_stats()
+
+@app.get("/metrics/llm_hedging")
+async def llm_hedging_metrics():
+    """Hedged LLM calls and latency percentiles per model and prompt type."""
+    return get_hedging_stats()
+
+@app.get("/metrics/llm_routes")
+async def llm_route_metrics():
+    """Model, call, token and latency counters per LLM route."""
+    return get_route_stats()
+
+def provider_unavailable(e: CircuitOpenError) -> HTTPException:
+    """503 telling the client when to retry while the LLM circuit breaker is open."""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+
 # Setup endpoint
 @app.post("/setup")
-async def setup(request: SetupRequest):
+async def setup(request: SetupRequest, http_request: Request):
     """Process setup and generate content strategy."""
     logger.info(f"Received setup request for email: {request.email}")
     try:
-        result = await process_setup_endpoint(request)
+        result = await process_setup_endpoint(request, http_request)
         return result
     except HTTPException as e:
         logger.error(f"HTTP exception in setup endpoint: {str(e)}")
         raise
+    except CircuitOpenError as e:
+        logger.error(f"LLM provider unavailable in setup endpoint: {str(e)}")
+        raise provider_unavailable(e)
     except Exception as e:
         logger.error(f"Unexpected error in setup endpoint: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Failed to process setup: {str(e)}")
 
+# Streaming setup endpoint
+@app.post("/setup/stream")
+async def setup_stream(request: SetupRequest):
+    """Generate the content strategy as a job, streaming its tokens as server-sent events.
+
+    The job keeps running and stores the strategy if the client disconnects;
+    the first event carries the job id to poll in that case.
+    """
+    logger.info(f"Received streaming setup request for email: {request.email}")
+    job = await job_queue.submit("setup_stream", request.email, request.dict())
+    return StreamingResponse(
+        job_queue.stream(job["_id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Content planner endpoint
 @app.post("/content_planner")
-async def content_planner(request: ContentStrategyInput):
+async def content_planner(request: ContentStrategyInput, http_request: Request):
     """Generate content schedule based on strategy."""
     logger.info(f"Received content planner request for email: {request.email}")
     try:
-        result = await generate_content_schedule(request)
+        result = await generate_content_schedule(request, http_request)
         return result
     except HTTPException as e:
         logger.error(f"HTTP exception in content_planner endpoint: {str(e)}")
         raise
+    except CircuitOpenError as e:
+        logger.error(f"LLM provider unavailable in content_planner endpoint: {str(e)}")
+        raise provider_unavailable(e)
     except Exception as e:
         logger.error(f"Unexpected error in content_planner endpoint: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Failed to generate content schedule: {str(e)}")
 
+# Background job handlers
+async def run_setup_job(payload: Dict, report, emit) -> Dict:
+    """Run the setup crew for a queued job."""
+    await report(0.1, "Generating content strategy")
+    return await process_setup_endpoint(SetupRequest(**payload))
+
+async def run_setup_stream_job(payload: Dict, report, emit) -> Dict:
+    """Generate the content strategy for a queued job, emitting its tokens."""
+    await report(0.1, "Generating content strategy")
+    return await stream_setup(SetupRequest(**payload), emit)
+
+async def run_content_planner_job(payload: Dict, report, emit) -> List[Dict]:
+    """Run the content planner crew for a queued job."""
+    await report(0.1, "Generating content schedule")
+    return await generate_content_schedule(ContentStrategyInput(**payload))
+
+job_queue.register("setup", run_setup_job)
+job_queue.register("setup_stream", run_setup_stream_job)
+job_queue.register("content_planner", run_content_planner_job)
+
+# Job submission endpoints
+@app.post("/jobs/setup", status_code=202, response_model=JobResponse)
+async def submit_setup_job(request: SetupRequest):
+    """Queue setup and return a job id to poll."""
+    logger.info(f"Received setup job for email: {request.email}")
+    job = await job_queue.submit("setup", request.email, request.dict())
+    return serialize_job(job)
+
+@app.post("/jobs/content_planner", status_code=202, response_model=JobResponse)
+async def submit_content_planner_job(request: ContentStrategyInput):
+    """Queue content planning and return a job id to poll."""
+    logger.info(f"Received content planner job for email: {request.email}")
+    job = await job_queue.submit("content_planner", request.email, request.dict())
+    return serialize_job(job)
+
+# Job status endpoints
+@app.get("/jobs/latest", response_model=JobResponse)
+async def get_latest_user_job(email: str, kind: str):
+    """Get a user's most recent job of a kind, e.g. after reconnecting."""
+    job = await get_latest_job(email, kind)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_status(job_id: str):
+    """Get the status, progress and result of a job."""
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream job progress as server-sent events until the job ends."""
+    return StreamingResponse(
+        job_queue.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Store credentials endpoint
 @app.post("/store_credentials")
 async def store_user_credentials(request: CredentialsRequest):
@@ -117,7 +279,7 @@ async def store_user_credentials(request: CredentialsRequest):
     logger.info(f"Received credentials request for email: {request.email}")
     try:
         # Check if user exists
-        user = get_user_by_email(request.email)
+        user = await get_user_by_email(request.email)
         if not user:
             logger.warning(f"User not found for email: {request.email}")
             raise HTTPException(status_code=404, detail="User not found")
@@ -126,7 +288,7 @@ async def store_user_credentials(request: CredentialsRequest):
         posting_email = request.posting_email or request.email
         
         # Store credentials
-        creds_id = store_credentials(
+        creds_id = await store_credentials(
             user_uuid=user_uuid,
             email=request.email,
             credentials=request.credentials,
@@ -317,7 +317,8 @@ import sys
 # Add the parent directory to system path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import os
-from fastapi import HTTPException
+import asyncio
+from fastapi import HTTPException, Request
 from crewai import Agent, Task, Crew
 from crewai.tools import tool
 import json
@@ -325,10 +326,11 @@ from textwrap import dedent
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel
-from typing import Dict, List, Any
-import litellm
-from langchain.chat_models import ChatLiteLLM
-from config.database import get_user_by_email, create_user, store_setup
+from typing import Callable, Dict, List, Any, Optional
+from config.async_database import get_or_create_user, store_setup
+from config.llm import get_route_llm
+from config.crew_executor import run_crew
+from config.agent_registry import agent_registry, AGENT_VERBOSE
 
 
 class SetupRequest(BaseModel):
@@ -340,17 +342,10 @@ class SetupRequest(BaseModel):
 
 load_dotenv()
 
-# Initialize Gemini LLM using LiteLLM
-llm = ChatLiteLLM(
-    model="gemini/gemini-2.0-flash",
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
-
 # Define Tools
-@tool
-def generate_strategy_tool(brand_guidelines: dict, goals: str, target_audience: dict, platforms: List[str]) -> str:
-    """Generate an initial content strategy using Gemini."""
-    prompt = f"""
+def build_strategy_prompt(brand_guidelines: dict, goals: str, target_audience: dict, platforms: List[str]) -> str:
+    """Build the strategy prompt shared by the crew tool and the streaming endpoint."""
+    return f"""
         You are a social media strategist tasked with creating a detailed, actionable content strategy for a brand. The strategy should be tailored to the provided brand guidelines, goals, target audience, and platforms, and should be structured for immediate execution. Include the following sections:
 
         1. **Content Pillars**: Define 3-4 core themes that align with the brand’s voice, tone, and audience interests. Explain why each pillar is relevant.
@@ -368,7 +363,12 @@ def generate_strategy_tool(brand_guidelines: dict, goals: str, target_audience:
         - Target Audience: Demographics={target_audience['demographics']}, Psychographics={target_audience['psychographics']}, Behaviors={target_audience.get('behaviors', 'N/A')}
         - Platforms: {', '.join(platforms)}
     """
-    response = llm.invoke(prompt)
+
+@tool
+def generate_strategy_tool(brand_guidelines: dict, goals: str, target_audience: dict, platforms: List[str]) -> str:
+    """Generate an initial content strategy using Gemini."""
+    prompt = build_strategy_prompt(brand_guidelines, goals, target_audience, platforms)
+    response = get_route_llm("strategy").invoke(prompt)
     return response.content
 
 # Define Agents
@@ -381,10 +381,12 @@ def strategy_agent():
             social media plans based on brand and audience insights.
         """),
         tools=[generate_strategy_tool],
-        llm=llm,
-        verbose=True
+        llm=get_route_llm("strategy_agent"),
+        verbose=AGENT_VERBOSE
     )
 
+agent_registry.register("strategist", strategy_agent)
+
 # Define Tasks
 def strategy_task(agent, brand_guidelines, goals, target_audience, platforms):
     return Task(
@@ -412,26 +414,26 @@ def strategy_task(agent, brand_guidelines, goals, target_audience, platforms):
         """)
     )
 
-async def process_setup(email: str, brand_guidelines: Dict[str, str], goals: str, target_audience: Dict[str, str], platforms: List[str]):
-    # Check or create user
-    user = get_user_by_email(email)
-    if not user:
-        user = create_user(email)
+def run_strategy_crew(brand_guidelines: Dict[str, str], goals: str, target_audience: Dict[str, str], platforms: List[str]):
+    """Run the strategy crew with a pooled strategist agent."""
+    with agent_registry.checkout("strategist") as strategist:
+        task = strategy_task(strategist, brand_guidelines, goals, target_audience, platforms)
+        setup_crew = Crew(
+            agents=[strategist],
+            tasks=[task],
+            verbose=AGENT_VERBOSE
+        )
+        return setup_crew.kickoff()
+
+async def process_setup(email: str, brand_guidelines: Dict[str, str], goals: str, target_audience: Dict[str, str], platforms: List[str],
+                        http_request: Optional[Request] = None):
+    # Get or create user in a single atomic upsert
+    user = await get_or_create_user(email)
     user_uuid = user["uuid"]
 
-    # Instantiate agent and task
-    strategist = strategy_agent()
-    task = strategy_task(strategist, brand_guidelines, goals, target_audience, platforms)
-
-    # Define Crew
-    setup_crew = Crew(
-        agents=[strategist],
-        tasks=[task],
-        verbose=True
-    )
-
-    # Run the crew
-    result = setup_crew.kickoff()
+    # Run the crew off the event loop
+    result = await run_crew("setup", run_strategy_crew, brand_guidelines, goals, target_audience, platforms,
+                            request=http_request)
     content_strategy = result if isinstance(result, str) else result.raw
 
     # Store setup in MongoDB
@@ -441,7 +443,7 @@ async def process_setup(email: str, brand_guidelines: Dict[str, str], goals: str
         "target_audience": target_audience,
         "platforms": platforms
     }
-    setup_id = store_setup(user_uuid, email, setup_data, content_strategy)
+    setup_id = await store_setup(user_uuid, email, setup_data, content_strategy)
 
     return {
         "result": {
@@ -450,13 +452,49 @@ async def process_setup(email: str, brand_guidelines: Dict[str, str], goals: str
         }
     }
 
-async def process_setup_endpoint(request: SetupRequest):
+async def process_setup_endpoint(request: SetupRequest, http_request: Optional[Request] = None):
     print("Received request data:", request)
     result = await process_setup(
         email=request.email,
         brand_guidelines=request.brand_guidelines,
         goals=request.goals,
         target_audience=request.target_audience,
-        platforms=request.platforms
+        platforms=request.platforms,
+        http_request=http_request
     )
     return result
+
+async def stream_setup(request: SetupRequest, emit: Callable[[str], None]) -> Dict:
+    """Generate the content strategy, passing each token to emit as it arrives.
+
+    Runs as a job, so the full strategy is stored with store_setup even if
+    the client stops reading the stream. Returns the same shape as the
+    /setup response. The strategy prompt is sent straight to the LLM, since
+    a crew only returns its output once the task has finished.
+    """
+    # Look up the user while the LLM is generating
+    user_task = asyncio.create_task(get_or_create_user(request.email))
+    try:
+        prompt = build_strategy_prompt(request.brand_guidelines, request.goals, request.target_audience, request.platforms)
+        chunks = []
+        async for chunk in get_route_llm("strategy").astream(prompt):
+            if chunk.content:
+                chunks.append(chunk.content)
+                emit(chunk.content)
+        content_strategy = "".join(chunks)
+
+        user = await user_task
+        setup_data = {
+            "brand_guidelines": request.brand_guidelines,
+            "goals": request.goals,
+            "target_audience": request.target_audience,
+            "platforms": request.platforms
+        }
+        setup_id = await store_setup(user["uuid"], request.email, setup_data, content_strategy)
+        return {"result": {"raw": content_strategy, "setup_id": setup_id}}
+    except Exception as e:
+        print(f"Error streaming setup: {str(e)}")
+        raise
+    finally:
+        if not user_task.done():
+            user_task.cancel()
@@ -5,10 +5,20 @@ from textwrap import dedent
 # from openai import OpenAI
 from dotenv import load_dotenv
 import os
+import sys
 import logging
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from crewai.tools import tool 
 
+# Add the parent directory to system path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.llm import get_route_llm
+from config.json_extract import extract_json, iter_json_array, JSONExtractionError
+from config.models import Post, Platform, ContentType
+from config.agent_registry import agent_registry, AGENT_VERBOSE
+from config.rate_limiter import estimate_tokens
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,14 +26,16 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-import litellm
-from langchain.chat_models import ChatLiteLLM
-
-# Initialize Gemini LLM using LiteLLM
-llm = ChatLiteLLM(
-    model="gemini/gemini-2.0-flash",
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
+# Values used for post details missing from the tool input
+CONTENT_DEFAULTS = {
+    "platform": "LinkedIn",
+    "content_type": "Post",
+    "pillar_or_campaign": "General",
+    "description": "Professional content for social media",
+    "week": 1,
+    "day": "Monday",
+    "time": "9:00 AM EST"
+}
 
 # Tool to generate social media content
 @tool
@@ -32,50 +44,28 @@ def content_generator_tool(post_details: str) -> str:
     logger.info("Generating content for post")
     
     try:
-        # Parse JSON input
+        # Validate the input, filling fields the caller left out
         if isinstance(post_details, str):
-            details = json.loads(post_details)
-        else:
-            details = post_details  # If it's already a dict
-
-        # Validate required fields
-        required_fields = ["platform", "content_type", "pillar_or_campaign", "description", "week", "day", "time"]
-        missing_fields = [field for field in required_fields if field not in details]
-        
-        if missing_fields:
-            # Provide default values for missing fields
-            defaults = {
-                "platform": "LinkedIn",  # Default platform
-                "content_type": "Post",  # Default content type
-                "pillar_or_campaign": "General",  # Default pillar
-                "description": "Professional content for social media",  # Default description
-                "week": 1,  # Default week
-                "day": "Monday",  # Default day
-                "time": "9:00 AM EST"  # Default time
-            }
-            
-            # Fill in missing fields with defaults
-            for field in missing_fields:
-                details[field] = defaults[field]
-                logger.warning(f"Using default value for missing field '{field}': {defaults[field]}")
+            post_details = extract_json(post_details, expect=dict)
+        post = Post.from_json({**CONTENT_DEFAULTS, **post_details})
 
         # Adjust content type for Instagram (no "Article", use Carousel instead)
-        content_type = details["content_type"]
-        if details["platform"] == "Instagram" and content_type == "Article":
-            content_type = "Carousel"
+        content_type = post.content_type_label
+        if post.platform == Platform.INSTAGRAM and post.content_type == ContentType.ARTICLE:
+            content_type = ContentType.CAROUSEL.value
             logger.info("Adjusted content_type from Article to Carousel for Instagram")
 
         prompt = f"""
-        You are a social media content creator tasked with generating a complete post for {details['platform']} 
+        You are a social media content creator tasked with generating a complete post for {post.platform_label} 
         based on the following details:
 
-        Platform: {details['platform']}
+        Platform: {post.platform_label}
         Content Type: {content_type}
-        Pillar/Campaign: {details['pillar_or_campaign']}
-        Description: {details['description']}
-        Week: {details['week']}
-        Day: {details['day']}
-        Time: {details['time']}
+        Pillar/Campaign: {post.pillar_or_campaign}
+        Description: {post.description}
+        Week: {post.week}
+        Day: {post.day}
+        Time: {post.time}
 
         Create a post that includes:
         1. A concise, engaging caption
@@ -89,31 +79,31 @@ def content_generator_tool(post_details: str) -> str:
             "caption": "Your caption here",
             "hashtags": ["hash1", "hash2", "hash3"],
             "visual_description": "Description of the visual content",
-            "platform": "{details['platform']}",
-            "week": {details['week']},
-            "day": "{details['day']}",
-            "time": "{details['time']}"
+            "platform": "{post.platform.value}",
+            "week": {post.week},
+            "day": "{post.day}",
+            "time": "{post.time}"
         }}
         """
 
         # Generate content using LLM
-        response = llm.invoke(prompt)
+        response = get_route_llm("copy").invoke(prompt)
         
         # Ensure the response is properly formatted as JSON
         try:
-            # Try to parse the response as JSON
-            json_response = json.loads(response.content)
+            # Find the JSON object in the response, repairing common defects
+            json_response = extract_json(response.content, expect=dict)
             return json.dumps(json_response)
-        except json.JSONDecodeError:
+        except JSONExtractionError:
             # If response is not JSON, create a structured response
             formatted_response = {
                 "caption": response.content[:200],  # Truncate long responses
                 "hashtags": ["#professional", "#business", "#innovation"],  # Default hashtags
                 "visual_description": "Minimalist professional design with brand colors",
-                "platform": details['platform'],
-                "week": details['week'],
-                "day": details['day'],
-                "time": details['time']
+                "platform": post.platform.value,
+                "week": post.week,
+                "day": post.day,
+                "time": post.time
             }
             return json.dumps(formatted_response)
 
@@ -135,10 +125,12 @@ def content_generator_agent():
             and engaging articles that resonate with readers and adhere to SEO best practices.
         """),
         tools=[content_generator_tool],
-        llm=llm,
-        verbose=True
+        llm=get_route_llm("copy"),
+        verbose=AGENT_VERBOSE
     )
 
+agent_registry.register("content_creator", content_generator_agent)
+
 # Task to generate content
 def content_generator_task(agent, platform,description):
     return Task(
@@ -172,34 +164,178 @@ def text_generator(platform, description):
         }
         post_details_json = json.dumps(post_details)
 
-        # Instantiate agent (assuming content_generator_agent is defined elsewhere)
-        creator = content_generator_agent()
+        # Borrow a pooled agent; only the task and crew are built per post
+        with agent_registry.checkout("content_creator") as creator:
+            task = content_generator_task(creator, platform, description)
 
-        # Define task (assuming content_generator_task is defined elsewhere)
-        task = content_generator_task(creator, platform, description)
+            # Define Crew
+            crew = Crew(
+                agents=[creator],
+                tasks=[task],
+                verbose=AGENT_VERBOSE
+            )
 
-        # Define Crew
-        crew = Crew(
-            agents=[creator],
-            tasks=[task],
-            verbose=True
-        )
-
-        # Run the crew
-        result = crew.kickoff(inputs={"post_details": post_details_json})
+            # Run the crew
+            result = crew.kickoff(inputs={"post_details": post_details_json})
 
         # Parse the output
-        content = json.loads(result.tasks_output[0].output)
+        content = extract_json(result.tasks_output[0].raw, expect=dict)
         logger.info("Content generated successfully")
         return content
 
-    except json.JSONDecodeError as e:
+    except JSONExtractionError as e:
         logger.error("JSON parsing error: %s", str(e))
         raise
     except Exception as e:
         logger.error("Error in content generation: %s", str(e))
         raise
 
+# Batch generation: many posts per LLM call
+# Most posts packed into one prompt
+TEXT_BATCH_MAX_POSTS = int(os.getenv("TEXT_BATCH_MAX_POSTS", "10"))
+# Token budgets per call; output is estimated at TEXT_BATCH_OUTPUT_TOKENS_PER_POST per post
+TEXT_BATCH_MAX_PROMPT_TOKENS = int(os.getenv("TEXT_BATCH_MAX_PROMPT_TOKENS", "6000"))
+TEXT_BATCH_MAX_OUTPUT_TOKENS = int(os.getenv("TEXT_BATCH_MAX_OUTPUT_TOKENS", "6000"))
+TEXT_BATCH_OUTPUT_TOKENS_PER_POST = int(os.getenv("TEXT_BATCH_OUTPUT_TOKENS_PER_POST", "300"))
+# Batch prompts sent at the same time
+TEXT_BATCH_MAX_CONCURRENCY = int(os.getenv("TEXT_BATCH_MAX_CONCURRENCY", "4"))
+# Extra attempts for posts whose generated content failed validation
+TEXT_BATCH_MAX_RETRIES = int(os.getenv("TEXT_BATCH_MAX_RETRIES", "2"))
+
+BATCH_PROMPT_HEADER = dedent("""
+    You are a social media content creator. Write a complete post for each numbered post spec below.
+    Each post needs a concise, engaging caption suited to its platform and content type, 5-8 relevant
+    hashtags, and a description of the visual content. The content should be professional, formal and
+    minimalist in style, targeting tech-savvy professionals.
+
+    Return only a JSON array with one object per post spec, using its number as "id":
+    [{"id": 1, "caption": "...", "hashtags": ["#one", "#two"], "visual_description": "..."}]
+
+    Post specs (number|platform|content type|pillar or campaign|description):
+""").lstrip()
+
+def post_spec_line(index: int, post: Post) -> str:
+    """Describe one post on a single prompt line."""
+    content_type = post.content_type_label
+    if post.platform == Platform.INSTAGRAM and post.content_type == ContentType.ARTICLE:
+        content_type = ContentType.CAROUSEL.value
+    fields = (post.platform_label, content_type, post.pillar_or_campaign, post.description)
+    return f"{index}|" + "|".join(str(field).replace("|", "/").replace("\n", " ") for field in fields)
+
+def pack_batches(posts: Dict[int, Post]) -> List[List[int]]:
+    """Group post indexes into as few prompts as the post and token limits allow."""
+    header_tokens = estimate_tokens(BATCH_PROMPT_HEADER)
+    batches = []
+    batch, prompt_tokens = [], header_tokens
+    for index, post in posts.items():
+        line_tokens = estimate_tokens(post_spec_line(index, post))
+        full = (len(batch) >= TEXT_BATCH_MAX_POSTS
+                or prompt_tokens + line_tokens > TEXT_BATCH_MAX_PROMPT_TOKENS
+                or (len(batch) + 1) * TEXT_BATCH_OUTPUT_TOKENS_PER_POST > TEXT_BATCH_MAX_OUTPUT_TOKENS)
+        if batch and full:
+            batches.append(batch)
+            batch, prompt_tokens = [], header_tokens
+        batch.append(index)
+        prompt_tokens += line_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def validate_generated(item: Any) -> Optional[Dict]:
+    """Check one generated post, returning its normalised content or None if invalid."""
+    if not isinstance(item, dict):
+        return None
+    caption = item.get("caption")
+    hashtags = item.get("hashtags")
+    visual_description = item.get("visual_description")
+    if not isinstance(caption, str) or not caption.strip():
+        return None
+    if isinstance(hashtags, str):
+        hashtags = hashtags.split()
+    if not isinstance(hashtags, list) or not hashtags:
+        return None
+    hashtags = [tag if str(tag).startswith("#") else f"#{tag}" for tag in map(str, hashtags) if tag]
+    return {
+        "caption": caption.strip(),
+        "hashtags": hashtags,
+        "visual_description": visual_description.strip() if isinstance(visual_description, str) else ""
+    }
+
+def stream_batch_items(llm: Any, prompt: str) -> Tuple[List[Any], Optional[Exception]]:
+    """Stream one batch prompt, parsing post items as they complete.
+
+    Returns the items and the error that ended the reply early, if any; the
+    items completed before a failure are kept.
+    """
+    items = []
+    try:
+        for item in iter_json_array(part.content for part in llm.stream(prompt)):
+            items.append(item)
+    except Exception as e:
+        return items, e
+    return items, None
+
+def text_generator_batch(posts: List[Union[Post, Dict]]) -> List[Optional[Dict]]:
+    """Generate text content for many posts with as few LLM calls as possible.
+
+    Posts are packed into prompts by pack_batches and the prompts are
+    streamed concurrently. Each reply is split back into per-post results
+    by id as it streams, so a reply that is cut off or fails midway keeps
+    the posts it completed, and only the posts whose content is missing or
+    fails validation are sent again, up to TEXT_BATCH_MAX_RETRIES more
+    times. Streamed calls never read the LLM cache, so a retry always gets
+    a fresh reply. Returns one result per input post, in order, in the
+    shape content_generator_tool returns, or None for posts that never
+    produced valid content.
+    """
+    parsed = {index: post if isinstance(post, Post) else Post.from_json(post) for index, post in enumerate(posts, 1)}
+    results: Dict[int, Dict] = {}
+    pending = dict(parsed)
+    llm = get_route_llm("copy_batch")
+    for attempt in range(TEXT_BATCH_MAX_RETRIES + 1):
+        if not pending:
+            break
+        batches = pack_batches(pending)
+        prompts = [
+            BATCH_PROMPT_HEADER + "\n".join(post_spec_line(index, pending[index]) for index in batch)
+            for batch in batches
+        ]
+        logger.info("Generating text for %d posts in %d prompts (attempt %d)", len(pending), len(prompts), attempt + 1)
+        with ThreadPoolExecutor(max_workers=min(TEXT_BATCH_MAX_CONCURRENCY, len(prompts)),
+                                thread_name_prefix="text-batch") as executor:
+            replies = list(executor.map(lambda prompt: stream_batch_items(llm, prompt), prompts))
+
+        for batch, (items, error) in zip(batches, replies):
+            if error is not None:
+                logger.error("Text batch failed after %d items: %s", len(items), str(error))
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    index = int(item.get("id"))
+                except (TypeError, ValueError):
+                    continue
+                content = validate_generated(item)
+                if index in batch and index in pending and content is not None:
+                    results[index] = content
+                    del pending[index]
+
+    for index in pending:
+        logger.warning("No valid text generated for post %d (%s)", index, parsed[index].platform.value)
+
+    output = []
+    for index, post in parsed.items():
+        content = results.get(index)
+        if content is not None:
+            content.update({
+                "platform": post.platform.value,
+                "week": post.week,
+                "day": post.day,
+                "time": post.time
+            })
+        output.append(content)
+    return output
+
 # # Example usage
 # if __name__ == "__main__":
 #     example_post = {
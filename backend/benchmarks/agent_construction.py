@@ -0,0 +1,90 @@
+"""Per-request cost of building CrewAI agents against checking them out of the registry.
+
+"per request" repeats what the agents did before they were pooled: call
+the template factory, then build the task and crew. "registry" checks the
+agents out of an AgentRegistry and builds only the task and crew. The
+first registry request includes the one-time build. Nothing is kicked off,
+so no provider is called.
+
+    python backend/benchmarks/agent_construction.py --requests 200
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from typing import Any, Callable, List, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "agents"))
+
+from crewai import Crew, Task
+
+import setup_agent
+import text_generator_agent
+import image_generator_agent
+from config.agent_registry import AgentRegistry
+
+BRAND_GUIDELINES = {"voice": "Friendly", "tone": "Professional", "visual_style": "Minimalist", "dos_donts": "No jargon"}
+TARGET_AUDIENCE = {"demographics": "25-40", "psychographics": "Tech-savvy"}
+
+def strategist_tasks(agent) -> List[Task]:
+    return [setup_agent.strategy_task(agent, BRAND_GUIDELINES, "Grow awareness", TARGET_AUDIENCE, ["LinkedIn"])]
+
+def content_creator_tasks(agent) -> List[Task]:
+    return [text_generator_agent.content_generator_task(agent, "LinkedIn", "Share an industry statistic")]
+
+def content_creation_team_tasks(agents) -> List[Task]:
+    return [
+        Task(description=f"Step {index} for LinkedIn", expected_output="Text", agent=agent)
+        for index, agent in enumerate(agents, 1)
+    ]
+
+# Template name, factory and the per-request tasks built for its agents
+TEMPLATES: List[Tuple[str, Callable[[], Any], Callable[[Any], List[Task]]]] = [
+    ("strategist", setup_agent.strategy_agent, strategist_tasks),
+    ("content_creator", text_generator_agent.content_generator_agent, content_creator_tasks),
+    ("content_creation_team", image_generator_agent.content_creation_team, content_creation_team_tasks),
+]
+
+def build_crew(agents: Any, tasks: Callable[[Any], List[Task]]) -> Crew:
+    return Crew(agents=list(agents) if isinstance(agents, tuple) else [agents], tasks=tasks(agents))
+
+def measure(request: Callable[[], None], requests: int) -> List[float]:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        request()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def report(name: str, latencies: List[float]) -> None:
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(f"  {name:<12} first {latencies[0]:8.2f} ms   mean {statistics.mean(latencies):8.2f} ms   "
+          f"p50 {statistics.median(latencies):8.2f} ms   p95 {p95:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests per template")
+    for name, factory, tasks in TEMPLATES:
+        registry = AgentRegistry()
+        registry.register(name, factory)
+
+        def per_request():
+            build_crew(factory(), tasks)
+
+        def pooled():
+            with registry.checkout(name) as agents:
+                build_crew(agents, tasks)
+
+        # Warm up lazy imports so neither arm pays for them
+        build_crew(factory(), tasks)
+        print(name)
+        report("per request", measure(per_request, args.requests))
+        report("registry", measure(pooled, args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Parse-success rate and time of LLM reply parsing on a malformed and truncated corpus.
+
+"before" is the parsing the agents did before config.json_extract: strip
+```json fences with string replaces, then json.loads. "after" is
+extract_json, falling back to iter_json_array for the complete items of a
+cut-off array, as the planner and batch generator do while streaming.
+
+    python backend/benchmarks/json_extract_fuzz.py --replies 2000 --seed 0
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config.json_extract import JSONExtractionError, extract_json, iter_json_array
+
+def parse_before(reply: str) -> List[Any]:
+    text = reply.replace("```json\n", "").replace("\n```", "").strip()
+    return json.loads(text)
+
+def parse_after(reply: str) -> List[Any]:
+    try:
+        return extract_json(reply, expect=list)
+    except JSONExtractionError:
+        return list(iter_json_array([reply]))
+
+def fence(text: str, rng: random.Random) -> str:
+    return f"```json\n{text}\n```"
+
+def prose(text: str, rng: random.Random) -> str:
+    return f"Sure! Here are the posts:\n\n{text}\n\nLet me know if you want any changes."
+
+def trailing_comma(text: str, rng: random.Random) -> str:
+    end = text.rfind("]")
+    return text[:end].rstrip() + ",\n" + text[end:]
+
+def python_literals(text: str, rng: random.Random) -> str:
+    # Single quotes and True/None, as when a model echoes a Python repr
+    return repr(json.loads(text))
+
+def truncate(text: str, rng: random.Random) -> str:
+    return text[:rng.randint(len(text) // 2, len(text) - 1)]
+
+# Applied in this order, each with its probability
+DEFECTS: List[Tuple[Callable[[str, random.Random], str], float]] = [
+    (python_literals, 0.2),
+    (trailing_comma, 0.3),
+    (truncate, 0.3),
+    (fence, 0.5),
+    (prose, 0.4),
+]
+
+def make_reply(rng: random.Random) -> Tuple[str, List[Dict]]:
+    """A batch reply with random defects, and the items it was made from."""
+    items = [
+        {
+            "id": i,
+            "caption": f"Post {i}: why {rng.choice(['latency', 'cost', 'quality'])} matters",
+            "hashtags": ["#tech", "#ai"],
+            "visual_description": "A minimalist chart",
+            "featured": rng.random() < 0.5,
+            "link": None,
+        }
+        for i in range(1, rng.randint(3, 10) + 1)
+    ]
+    text = json.dumps(items, indent=2)
+    for defect, probability in DEFECTS:
+        if rng.random() < probability:
+            text = defect(text, rng)
+    return text, items
+
+def run(parse: Callable[[str], List[Any]], corpus: List[Tuple[str, List[Dict]]]) -> Dict[str, float]:
+    parsed = recovered = total = 0
+    started = time.perf_counter()
+    for reply, items in corpus:
+        total += len(items)
+        try:
+            result = parse(reply)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(result, list) and result:
+            parsed += 1
+            recovered += sum(1 for item in result if isinstance(item, dict) and item in items)
+    elapsed = time.perf_counter() - started
+    return {
+        "parsed": parsed / len(corpus),
+        "recovered": recovered / total,
+        "us_per_reply": elapsed / len(corpus) * 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replies", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_reply(rng) for _ in range(args.replies)]
+    clean = sum(1 for reply, items in corpus if reply == json.dumps(items, indent=2))
+    print(f"{len(corpus)} replies, {clean} without defects")
+    for name, parse in (("before", parse_before), ("after", parse_after)):
+        result = run(parse, corpus)
+        print(f"{name:<7} parsed {result['parsed']:6.1%}   items recovered {result['recovered']:6.1%}   "
+              f"{result['us_per_reply']:8.1f} us/reply")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-call latency of the database helpers with a client per call and with the shared client.
+
+"per call" repeats what get_db_connection did before the client was
+shared: create a MongoClient, run the query, close the client. "shared"
+calls get_user_by_email, which reuses the process-wide pooled client.
+
+    python backend/benchmarks/mongo_client_latency.py              # MONGO_URI, e.g. a local mongod
+    python backend/benchmarks/mongo_client_latency.py --mongomock  # no server needed
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from typing import Callable, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from config import database
+
+EMAIL = "benchmark@example.com"
+
+def per_call_client() -> None:
+    client = database.MongoClient(database.MONGO_URI)
+    try:
+        client[database.DB_NAME].users.find_one({"email": EMAIL})
+    finally:
+        client.close()
+
+def shared_client() -> None:
+    database.get_user_by_email(EMAIL)
+
+def measure(fn: Callable[[], None], calls: int) -> List[float]:
+    fn()
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def report(name: str, latencies: List[float]) -> None:
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(f"{name:<10} mean {statistics.mean(latencies):8.3f} ms   "
+          f"p50 {statistics.median(latencies):8.3f} ms   p95 {p95:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--mongomock", action="store_true", help="use an in-memory mongomock server")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        database.MongoClient = mongomock.MongoClient
+    print(f"{args.calls} calls against {'mongomock' if args.mongomock else database.MONGO_URI}")
+    report("per call", measure(per_call_client, args.calls))
+    report("shared", measure(shared_client, args.calls))
+    database.close_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Posts per minute of batched text generation against one crew kickoff per post.
+
+"per post" runs text_generator for each post, one CrewAI crew kickoff per
+post, with TRIGGER_MAX_WORKERS posts at a time the way the trigger does.
+"batched" runs text_generator_batch over all the posts. Both arms call the
+same simulated provider, patched in as litellm.completion, whose latency
+grows with the tokens it writes, and which counts the calls and prompt
+tokens each arm sends. No provider is called.
+
+    python backend/benchmarks/text_batch_throughput.py --posts 40
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Keep the benchmark self-contained: no shared limiter store and no cached replies
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+
+import litellm
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "agents"))
+
+import text_generator_agent
+from config.models import Post
+
+SPEC_LINE = re.compile(r"^(\d+)\|", re.MULTILINE)
+
+class SimulatedProvider:
+    """Stands in for litellm.completion, answering after a provider-like delay.
+
+    Batch prompts get a JSON array with one post per spec line; any other
+    prompt is a crew agent's and gets a final answer with one post.
+    """
+
+    def __init__(self, first_token_seconds: float, seconds_per_token: float, tokens_per_post: int = 120):
+        # Time to first token, and time per generated token
+        self.first_token_seconds = first_token_seconds
+        self.seconds_per_token = seconds_per_token
+        self.tokens_per_post = tokens_per_post
+        self.calls = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+
+    def __call__(self, messages: List[Dict], stream: bool = False, **kwargs: Any) -> Any:
+        prompt = str(messages[-1]["content"])
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += sum(len(str(message["content"])) for message in messages) // 4
+        ids = [int(match) for match in SPEC_LINE.findall(prompt)]
+        if ids:
+            content = json.dumps([
+                {"id": i, "caption": f"Caption {i}", "hashtags": ["#tech", "#ai"], "visual_description": "A chart"}
+                for i in ids
+            ])
+        else:
+            post = {"caption": "Caption", "hashtags": ["#tech", "#ai"], "visual_description": "A chart"}
+            content = f"Thought: I now can give a great answer\nFinal Answer: {json.dumps(post)}"
+        seconds = self.first_token_seconds + self.seconds_per_token * self.tokens_per_post * max(1, len(ids))
+        if stream:
+            return self._stream(content, seconds)
+        time.sleep(seconds)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4}
+        }
+
+    def _stream(self, content: str, seconds: float) -> Iterator[Dict]:
+        time.sleep(self.first_token_seconds)
+        pieces = 10
+        step = -(-len(content) // pieces)
+        for start in range(0, len(content), step):
+            time.sleep((seconds - self.first_token_seconds) / pieces)
+            yield {"choices": [{"delta": {"role": "assistant", "content": content[start:start + step]}}]}
+
+def sample_posts(count: int) -> List[Post]:
+    return [
+        Post.from_json({
+            "platform": ["Instagram", "LinkedIn", "Twitter"][i % 3],
+            "content_type": "Article",
+            "pillar_or_campaign": "Industry Insights",
+            "description": f"Share industry statistic number {i} with a minimalist visual.",
+            "week": 1 + i // 7,
+            "day": "Monday",
+            "time": "11:00 AM EST",
+        })
+        for i in range(count)
+    ]
+
+def per_post(posts: List[Post], workers: int) -> float:
+    """Generate text with one crew kickoff per post and return the posts per minute."""
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda post: text_generator_agent.text_generator(post.platform.value, post.description), posts))
+    elapsed = time.monotonic() - started
+    assert all(result is not None for result in results)
+    return len(posts) / elapsed * 60
+
+def batched(posts: List[Post], batch_size: int) -> float:
+    """Generate text with text_generator_batch and return the posts per minute."""
+    text_generator_agent.TEXT_BATCH_MAX_POSTS = batch_size
+    started = time.monotonic()
+    results = text_generator_agent.text_generator_batch(posts)
+    elapsed = time.monotonic() - started
+    assert all(result is not None for result in results)
+    return len(posts) / elapsed * 60
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=text_generator_agent.TEXT_BATCH_MAX_POSTS)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TRIGGER_MAX_WORKERS", "8")),
+                        help="posts generated at a time in the per-post arm")
+    parser.add_argument("--first-token-seconds", type=float, default=0.8)
+    parser.add_argument("--seconds-per-token", type=float, default=0.01)
+    args = parser.parse_args()
+
+    provider = SimulatedProvider(args.first_token_seconds, args.seconds_per_token)
+    litellm.completion = provider
+    posts = sample_posts(args.posts)
+
+    def measure(run) -> Tuple[float, int, int]:
+        provider.reset()
+        rate = run()
+        return rate, provider.calls, provider.prompt_tokens
+
+    one_per_post, post_calls, post_tokens = measure(lambda: per_post(posts, args.workers))
+    in_batches, batch_calls, batch_tokens = measure(lambda: batched(posts, args.batch_size))
+    print(f"{args.posts} posts, {args.workers} per-post workers, "
+          f"batch concurrency {text_generator_agent.TEXT_BATCH_MAX_CONCURRENCY}")
+    print(f"one crew per post:   {one_per_post:8.1f} posts/min   {post_calls:4d} calls   {post_tokens:7d} prompt tokens")
+    print(f"batches of {args.batch_size:<3}       {in_batches:8.1f} posts/min   {batch_calls:4d} calls   "
+          f"{batch_tokens:7d} prompt tokens ({in_batches / one_per_post:.1f}x posts/min)")
+
+if __name__ == "__main__":
+    main()
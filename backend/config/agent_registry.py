@@ -0,0 +1,96 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Verbose CrewAI output for agents built by the registry
+AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false").lower() in ("1", "true", "yes")
+# Idle instances kept per template; extra instances are dropped when returned
+AGENT_POOL_MAX_IDLE = int(os.getenv("AGENT_POOL_MAX_IDLE", "8"))
+
+class _Pool:
+    """Idle instances of one template plus construction counters."""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self.idle: List[Any] = []
+        self.built = 0
+        self.reused = 0
+        self.discarded = 0
+        self.build_seconds = 0.0
+
+class AgentRegistry:
+    """Process-wide pools of CrewAI agents, built once and reused across calls.
+
+    A template is a factory returning an agent (or a tuple of agents that
+    work together). checkout() hands out an idle instance, building one only
+    when every existing instance is in use, and takes it back afterwards.
+    CrewAI agents hold per-run state, so an instance is only ever used by one
+    invocation at a time; tasks and crews remain per invocation. Instances
+    whose run raised are discarded rather than reused.
+    """
+
+    def __init__(self, max_idle: int = AGENT_POOL_MAX_IDLE):
+        self.max_idle = max_idle
+        self._pools: Dict[str, _Pool] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Register the factory that builds a template."""
+        with self._lock:
+            if name not in self._pools:
+                self._pools[name] = _Pool(factory)
+
+    @contextmanager
+    def checkout(self, name: str) -> Iterator[Any]:
+        """Borrow an instance of a template for one invocation."""
+        with self._lock:
+            pool = self._pools[name]
+            instance = pool.idle.pop() if pool.idle else None
+            if instance is not None:
+                pool.reused += 1
+        if instance is None:
+            # Build outside the lock so slow construction never blocks other templates
+            started = time.perf_counter()
+            instance = pool.factory()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                pool.built += 1
+                pool.build_seconds += elapsed
+            logger.info(f"Built agent template '{name}' in {elapsed * 1000:.1f} ms")
+        try:
+            yield instance
+        except BaseException:
+            with self._lock:
+                pool.discarded += 1
+            raise
+        else:
+            with self._lock:
+                if len(pool.idle) < self.max_idle:
+                    pool.idle.append(instance)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get build and reuse counters per template."""
+        with self._lock:
+            return {
+                name: {
+                    "built": pool.built,
+                    "reused": pool.reused,
+                    "discarded": pool.discarded,
+                    "idle": len(pool.idle),
+                    "avg_build_ms": pool.build_seconds / pool.built * 1000 if pool.built else 0.0
+                }
+                for name, pool in self._pools.items()
+            }
+
+# Shared registry for all agents in the process
+agent_registry = AgentRegistry()
+
+def get_agent_registry_stats() -> Dict[str, Dict[str, Any]]:
+    """Get build and reuse counters of the shared registry."""
+    return agent_registry.stats()
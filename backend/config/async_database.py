@@ -0,0 +1,248 @@
+import os
+import logging
+import traceback
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config.database import (
+    MONGO_URI,
+    DB_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    build_user_document,
+    build_setup_document,
+    build_schedule_document,
+    build_post_documents,
+    build_credentials_document,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the helpers in config.database, used by the FastAPI
+# endpoints so that database round-trips do not block the event loop. The
+# sync module stays the API for the trigger and the Streamlit pages.
+
+# Process-wide Motor client, created lazily on the running event loop
+_client: Optional[AsyncIOMotorClient] = None
+_client_pid: Optional[int] = None
+
+def get_async_client() -> AsyncIOMotorClient:
+    """Get the shared Motor client, creating it on first use."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        _client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS
+        )
+        _client_pid = pid
+        logger.info("Created Motor client (maxPoolSize=%d)", MONGO_MAX_POOL_SIZE)
+    return _client
+
+def get_async_db():
+    """Get the application database from the shared Motor client."""
+    return get_async_client()[DB_NAME]
+
+def close_async_client():
+    """Close the shared Motor client."""
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+        logger.info("Closed Motor client")
+    _client = None
+    _client_pid = None
+
+async def get_user_by_email(email: str) -> Optional[Dict]:
+    """Get user by email."""
+    try:
+        db = get_async_db()
+        user = await db.users.find_one({"email": email})
+        return user
+    except Exception as e:
+        logger.error(f"Error getting user by email: {str(e)}")
+        logger.error(traceback.format_exc())
+        return None
+
+async def create_user(email: str) -> Dict:
+    """Create a new user."""
+    try:
+        db = get_async_db()
+        user = build_user_document(email)
+        await db.users.insert_one(user)
+        return user
+    except Exception as e:
+        logger.error(f"Error creating user: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def get_or_create_user(email: str) -> Dict:
+    """Get the user for an email, creating it atomically if missing."""
+    try:
+        db = get_async_db()
+        try:
+            user = await db.users.find_one_and_update(
+                {"email": email},
+                {"$setOnInsert": build_user_document(email)},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            user = await db.users.find_one({"email": email})
+        return user
+    except Exception as e:
+        logger.error(f"Error getting or creating user: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def store_setup(user_uuid: str, email: str, setup_data: Dict, content_strategy: str) -> str:
+    """Store setup data and content strategy."""
+    try:
+        db = get_async_db()
+        setup = build_setup_document(user_uuid, email, setup_data, content_strategy)
+
+        # Insert or update setup and read back its _id in the same round trip
+        created_at = setup.pop("created_at")
+        setup_doc = await db.setups.find_one_and_update(
+            {"user_uuid": user_uuid},
+            {"$set": setup, "$setOnInsert": {"created_at": created_at}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        setup_id = str(setup_doc["_id"])
+
+        return setup_id
+    except Exception as e:
+        logger.error(f"Error storing setup: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def store_schedule(user_uuid: str, email: str, strategy_text: str, posts: List[Dict],
+                         time_period: str = "2 Weeks", post_frequency: str = "3 times per week",
+                         special_instructions: Optional[str] = None) -> str:
+    """Store content schedule."""
+    try:
+        db = get_async_db()
+        schedule = build_schedule_document(user_uuid, email, strategy_text, posts,
+                                           time_period, post_frequency, special_instructions)
+
+        # Insert schedule
+        result = await db.schedules.insert_one(schedule)
+
+        # Insert one document per post
+        post_docs = build_post_documents(result.inserted_id, user_uuid, email, posts)
+        if post_docs:
+            await db.posts.insert_many(post_docs, ordered=False)
+
+        return str(result.inserted_id)
+    except Exception as e:
+        logger.error(f"Error storing schedule: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def store_credentials(user_uuid: str, email: str, credentials: Dict, posting_email: str) -> str:
+    """Store platform credentials."""
+    try:
+        db = get_async_db()
+        creds_doc = build_credentials_document(user_uuid, email, credentials, posting_email)
+
+        # Insert or update credentials and read back its _id in the same round trip
+        created_at = creds_doc.pop("created_at")
+        credentials_doc = await db.credentials.find_one_and_update(
+            {"user_uuid": user_uuid},
+            {"$set": creds_doc, "$setOnInsert": {"created_at": created_at}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        creds_id = str(credentials_doc["_id"])
+
+        return creds_id
+    except Exception as e:
+        logger.error(f"Error storing credentials: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def create_job(job: Dict) -> str:
+    """Persist a new background job."""
+    try:
+        db = get_async_db()
+        await db.jobs.insert_one(job)
+        return job["_id"]
+    except Exception as e:
+        logger.error(f"Error creating job: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def update_job(job_id: str, fields: Dict) -> None:
+    """Update the status, progress or result of a background job."""
+    try:
+        db = get_async_db()
+        fields = dict(fields, updated_at=datetime.now().isoformat())
+        await db.jobs.update_one({"_id": job_id}, {"$set": fields})
+    except Exception as e:
+        logger.error(f"Error updating job: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def heartbeat_jobs(job_ids: List[str]) -> None:
+    """Mark jobs as still owned by a live process."""
+    try:
+        db = get_async_db()
+        await db.jobs.update_many(
+            {"_id": {"$in": job_ids}},
+            {"$set": {"heartbeat_at": datetime.now(timezone.utc)}}
+        )
+    except Exception as e:
+        logger.error(f"Error updating job heartbeats: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def fail_orphaned_jobs(statuses: List[str], cutoff: datetime, fields: Dict) -> int:
+    """Set fields on jobs in one of statuses whose owner has not sent a heartbeat since cutoff.
+
+    Jobs without a heartbeat at all are treated as orphaned. Returns the
+    number of jobs updated.
+    """
+    try:
+        db = get_async_db()
+        result = await db.jobs.update_many(
+            {"status": {"$in": statuses}, "heartbeat_at": {"$not": {"$gte": cutoff}}},
+            {"$set": dict(fields, updated_at=datetime.now().isoformat())}
+        )
+        return result.modified_count
+    except Exception as e:
+        logger.error(f"Error failing orphaned jobs: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+async def get_job(job_id: str) -> Optional[Dict]:
+    """Get a background job by id."""
+    try:
+        db = get_async_db()
+        return await db.jobs.find_one({"_id": job_id})
+    except Exception as e:
+        logger.error(f"Error getting job: {str(e)}")
+        logger.error(traceback.format_exc())
+        return None
+
+async def get_latest_job(email: str, kind: str) -> Optional[Dict]:
+    """Get the most recent job of a kind submitted by a user."""
+    try:
+        db = get_async_db()
+        return await db.jobs.find_one({"email": email, "kind": kind}, sort=[("created_at", -1)])
+    except Exception as e:
+        logger.error(f"Error getting latest job: {str(e)}")
+        logger.error(traceback.format_exc())
+        return None
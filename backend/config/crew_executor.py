@@ -0,0 +1,113 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Threads available for blocking crew runs across all endpoints
+CREW_MAX_WORKERS = int(os.getenv("CREW_MAX_WORKERS", "8"))
+# Crew runs allowed to wait for a thread before new ones are turned away
+CREW_MAX_QUEUE = int(os.getenv("CREW_MAX_QUEUE", "8"))
+# Concurrent crew runs allowed per endpoint
+ENDPOINT_LIMITS: Dict[str, int] = {
+    "setup": int(os.getenv("SETUP_MAX_CONCURRENCY", "4")),
+    "content_planner": int(os.getenv("CONTENT_PLANNER_MAX_CONCURRENCY", "4")),
+}
+DEFAULT_ENDPOINT_LIMIT = int(os.getenv("CREW_DEFAULT_MAX_CONCURRENCY", "4"))
+# How often a waiting request checks whether its client went away
+DISCONNECT_POLL_SECONDS = float(os.getenv("CREW_DISCONNECT_POLL_SECONDS", "1.0"))
+RETRY_AFTER_SECONDS = os.getenv("CREW_RETRY_AFTER_SECONDS", "10")
+
+class CrewCapacityError(HTTPException):
+    """Raised when a crew run is rejected for backpressure."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": RETRY_AFTER_SECONDS})
+
+class ClientDisconnectedError(HTTPException):
+    """Raised when the client went away before its crew run finished."""
+
+    def __init__(self):
+        super().__init__(status_code=499, detail="Client disconnected")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_in_flight: Dict[str, int] = {}
+_total_in_flight = 0
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the crew thread pool, creating it on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CREW_MAX_WORKERS, thread_name_prefix="crew")
+        return _executor
+
+def _acquire(endpoint: str) -> None:
+    """Reserve a slot for an endpoint or raise 429/503."""
+    global _total_in_flight
+    limit = ENDPOINT_LIMITS.get(endpoint, DEFAULT_ENDPOINT_LIMIT)
+    with _lock:
+        if _in_flight.get(endpoint, 0) >= limit:
+            raise CrewCapacityError(429, f"Too many concurrent {endpoint} requests, please retry later")
+        if _total_in_flight >= CREW_MAX_WORKERS + CREW_MAX_QUEUE:
+            raise CrewCapacityError(503, "Server is busy, please retry later")
+        _in_flight[endpoint] = _in_flight.get(endpoint, 0) + 1
+        _total_in_flight += 1
+
+def _release(endpoint: str) -> None:
+    """Free an endpoint slot once its crew run has really finished."""
+    global _total_in_flight
+    with _lock:
+        _in_flight[endpoint] -= 1
+        _total_in_flight -= 1
+
+async def run_crew(endpoint: str, fn: Callable[..., Any], *args: Any,
+                   request: Optional[Request] = None, **kwargs: Any) -> Any:
+    """Run a blocking crew call in the crew thread pool.
+
+    The event loop stays free while the crew runs. Each endpoint is capped at
+    its ENDPOINT_LIMITS concurrency (429 beyond it) and the pool as a whole
+    at CREW_MAX_WORKERS running plus CREW_MAX_QUEUE waiting (503 beyond it).
+    If request is given and the client disconnects, a run that has not
+    started yet is cancelled; one already running is left to finish in the
+    background, since threads cannot be interrupted, but the slot stays
+    taken until it does.
+    """
+    _acquire(endpoint)
+    try:
+        future = _get_executor().submit(fn, *args, **kwargs)
+    except Exception:
+        _release(endpoint)
+        raise
+    future.add_done_callback(lambda _: _release(endpoint))
+
+    wrapped = asyncio.wrap_future(future)
+    while True:
+        done, _ = await asyncio.wait({wrapped}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return wrapped.result()
+        if request is not None and await request.is_disconnected():
+            cancelled = future.cancel()
+            logger.warning(f"Client disconnected during {endpoint} crew run "
+                           f"({'cancelled before start' if cancelled else 'left to finish'})")
+            raise ClientDisconnectedError()
+
+def get_crew_executor_stats() -> Dict[str, Any]:
+    """Get in-flight crew runs per endpoint."""
+    with _lock:
+        return {"in_flight": dict(_in_flight), "total_in_flight": _total_in_flight}
+
+def shutdown_crew_executor() -> None:
+    """Stop accepting crew runs and release the thread pool."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
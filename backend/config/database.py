@@ -2,10 +2,13 @@ import os
 import uuid
 import logging
 import traceback
-from datetime import datetime
-from typing import Dict, List, Any, Optional
-from pymongo import MongoClient
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Union
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
+from config.models import Post
 
 # Load environment variables
 load_dotenv()
@@ -18,23 +21,176 @@ logger = logging.getLogger(__name__)
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "social_media_manager")
 
+# Post status values
+POST_STATUS_PENDING = "pending"
+POST_STATUS_UNSCHEDULED = "unscheduled"
+POST_STATUS_CLAIMED = "claimed"
+POST_STATUS_PUBLISHED = "published"
+POST_STATUS_FAILED = "failed"
+
+# Connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+
+# Process-wide client, created lazily and shared by every helper below.
+# MongoClient is thread-safe and owns its own connection pool, so one
+# instance per process is all we need. The pid is tracked because a client
+# inherited across fork() must not be reused by the child.
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+def _reset_client_after_fork():
+    """Drop the parent's client in a freshly forked child."""
+    global _client, _client_pid, _client_lock
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+def get_client() -> MongoClient:
+    """Get the shared MongoDB client, creating it on first use."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            try:
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    connect=False
+                )
+                _client_pid = pid
+                logger.info("Created MongoDB client (maxPoolSize=%d)", MONGO_MAX_POOL_SIZE)
+            except Exception as e:
+                logger.error(f"Failed to connect to MongoDB: {str(e)}")
+                logger.error(traceback.format_exc())
+                raise
+    return _client
+
+def get_db():
+    """Get the application database from the shared client."""
+    return get_client()[DB_NAME]
+
 def get_db_connection():
-    """Get MongoDB connection."""
-    try:
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        return client, db
-    except Exception as e:
-        logger.error(f"Failed to connect to MongoDB: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise
+    """Get MongoDB connection.
+
+    Returns the shared client and database. The client is pooled and must not
+    be closed by callers; use close_all() on process shutdown instead.
+    """
+    client = get_client()
+    return client, client[DB_NAME]
+
+def close_all():
+    """Close the shared MongoDB client and release its pooled connections."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+            logger.info("Closed MongoDB client")
+        _client = None
+        _client_pid = None
+
+def build_user_document(email: str) -> Dict:
+    """Build a new user document."""
+    return {
+        "uuid": str(uuid.uuid4()),
+        "email": email,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    }
+
+def build_setup_document(user_uuid: str, email: str, setup_data: Dict, content_strategy: str) -> Dict:
+    """Build a setup document from setup data and content strategy."""
+    return {
+        "user_uuid": user_uuid,
+        "email": email,
+        "brand_guidelines": setup_data.get("brand_guidelines", {}),
+        "goals": setup_data.get("goals", ""),
+        "target_audience": setup_data.get("target_audience", {}),
+        "platforms": setup_data.get("platforms", []),
+        "special_instructions": setup_data.get("special_instructions", ""),
+        "content_strategy": content_strategy,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    }
+
+def build_schedule_document(user_uuid: str, email: str, strategy_text: str, posts: List[Dict],
+                            time_period: str = "2 Weeks", post_frequency: str = "3 times per week",
+                            special_instructions: Optional[str] = None) -> Dict:
+    """Build a content schedule document.
+
+    Posts are not embedded; they are stored one per document in the posts
+    collection (see build_post_documents).
+    """
+    return {
+        "user_uuid": user_uuid,
+        "email": email,
+        "strategy_text": strategy_text,
+        "post_count": len(posts),
+        "time_period": time_period,
+        "post_frequency": post_frequency,
+        "special_instructions": special_instructions,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    }
+
+def build_post_documents(schedule_id, user_uuid: str, email: str, posts: List[Union[Post, Dict]]) -> List[Dict]:
+    """Build one document per scheduled post.
+
+    Posts may be Post instances or dicts, which are validated into Post.
+    Each document gains a schedule_id back-reference, a status and
+    timestamps. Posts without a due_at are stored as unscheduled so they
+    are never picked up by the trigger.
+    """
+    now = datetime.now().isoformat()
+    documents = []
+    for post in posts:
+        if not isinstance(post, Post):
+            post = Post.from_json(post)
+        if post.due_at is None:
+            logger.warning(f"Could not parse datetime for post: {post.local_datetime}")
+        document = post.model_copy(update={
+            "schedule_id": str(schedule_id),
+            "user_uuid": user_uuid,
+            "email": email,
+            "status": POST_STATUS_PENDING if post.due_at else POST_STATUS_UNSCHEDULED
+        }).to_bson()
+        document.update({
+            "due_at": post.due_at,
+            "created_at": now,
+            "updated_at": now
+        })
+        documents.append(document)
+    return documents
+
+def build_credentials_document(user_uuid: str, email: str, credentials: Dict, posting_email: str) -> Dict:
+    """Build a platform credentials document."""
+    return {
+        "user_uuid": user_uuid,
+        "email": email,
+        "credentials": credentials,
+        "posting_email": posting_email,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    }
 
 def get_user_by_email(email: str) -> Optional[Dict]:
     """Get user by email."""
     try:
-        client, db = get_db_connection()
+        db = get_db()
         user = db.users.find_one({"email": email})
-        client.close()
         return user
     except Exception as e:
         logger.error(f"Error getting user by email: {str(e)}")
@@ -44,56 +200,58 @@ def get_user_by_email(email: str) -> Optional[Dict]:
 def create_user(email: str) -> Dict:
     """Create a new user."""
     try:
-        client, db = get_db_connection()
-        user_uuid = str(uuid.uuid4())
-        user = {
-            "uuid": user_uuid,
-            "email": email,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        db = get_db()
+        user = build_user_document(email)
         db.users.insert_one(user)
-        client.close()
         return user
     except Exception as e:
         logger.error(f"Error creating user: {str(e)}")
         logger.error(traceback.format_exc())
         raise
 
+def get_or_create_user(email: str) -> Dict:
+    """Get the user for an email, creating it atomically if missing.
+
+    Relies on the unique index on users.email: two concurrent upserts for the
+    same email resolve to a single document, and the loser of the race reads
+    the winner's user back.
+    """
+    try:
+        db = get_db()
+        try:
+            user = db.users.find_one_and_update(
+                {"email": email},
+                {"$setOnInsert": build_user_document(email)},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            user = db.users.find_one({"email": email})
+        return user
+    except Exception as e:
+        logger.error(f"Error getting or creating user: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
 def store_setup(user_uuid: str, email: str, setup_data: Dict, content_strategy: str) -> str:
     """Store setup data and content strategy."""
     try:
-        client, db = get_db_connection()
+        db = get_db()
         
         # Create setup document
-        setup = {
-            "user_uuid": user_uuid,
-            "email": email,
-            "brand_guidelines": setup_data.get("brand_guidelines", {}),
-            "goals": setup_data.get("goals", ""),
-            "target_audience": setup_data.get("target_audience", {}),
-            "platforms": setup_data.get("platforms", []),
-            "special_instructions": setup_data.get("special_instructions", ""),
-            "content_strategy": content_strategy,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        setup = build_setup_document(user_uuid, email, setup_data, content_strategy)
         
-        # Insert or update setup
-        result = db.setups.update_one(
+        # Insert or update setup and read back its _id in the same round trip
+        created_at = setup.pop("created_at")
+        setup_doc = db.setups.find_one_and_update(
             {"user_uuid": user_uuid},
-            {"$set": setup},
-            upsert=True
+            {"$set": setup, "$setOnInsert": {"created_at": created_at}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
-        
-        # Get the ID of the inserted/updated document
-        if result.upserted_id:
-            setup_id = str(result.upserted_id)
-        else:
-            setup_doc = db.setups.find_one({"user_uuid": user_uuid})
-            setup_id = str(setup_doc["_id"])
-        
-        client.close()
+        setup_id = str(setup_doc["_id"])
+
         return setup_id
     except Exception as e:
         logger.error(f"Error storing setup: {str(e)}")
@@ -105,26 +263,21 @@ def store_schedule(user_uuid: str, email: str, strategy_text: str, posts: List[D
                   special_instructions: Optional[str] = None) -> str:
     """Store content schedule."""
     try:
-        client, db = get_db_connection()
+        db = get_db()
         
         # Create schedule document
-        schedule = {
-            "user_uuid": user_uuid,
-            "email": email,
-            "strategy_text": strategy_text,
-            "posts": posts,
-            "time_period": time_period,
-            "post_frequency": post_frequency,
-            "special_instructions": special_instructions,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        schedule = build_schedule_document(user_uuid, email, strategy_text, posts,
+                                           time_period, post_frequency, special_instructions)
         
         # Insert schedule
         result = db.schedules.insert_one(schedule)
         schedule_id = str(result.inserted_id)
-        
-        client.close()
+
+        # Insert one document per post
+        post_docs = build_post_documents(result.inserted_id, user_uuid, email, posts)
+        if post_docs:
+            db.posts.insert_many(post_docs, ordered=False)
+
         return schedule_id
     except Exception as e:
         logger.error(f"Error storing schedule: {str(e)}")
@@ -134,35 +287,270 @@ def store_schedule(user_uuid: str, email: str, strategy_text: str, posts: List[D
 def store_credentials(user_uuid: str, email: str, credentials: Dict, posting_email: str) -> str:
     """Store platform credentials."""
     try:
-        client, db = get_db_connection()
+        db = get_db()
         
         # Create credentials document
-        creds_doc = {
-            "user_uuid": user_uuid,
-            "email": email,
-            "credentials": credentials,
-            "posting_email": posting_email,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        creds_doc = build_credentials_document(user_uuid, email, credentials, posting_email)
         
-        # Insert or update credentials
-        result = db.credentials.update_one(
+        # Insert or update credentials and read back its _id in the same round trip
+        created_at = creds_doc.pop("created_at")
+        credentials_doc = db.credentials.find_one_and_update(
             {"user_uuid": user_uuid},
-            {"$set": creds_doc},
-            upsert=True
+            {"$set": creds_doc, "$setOnInsert": {"created_at": created_at}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
-        
-        # Get the ID of the inserted/updated document
-        if result.upserted_id:
-            creds_id = str(result.upserted_id)
-        else:
-            creds_doc = db.credentials.find_one({"user_uuid": user_uuid})
-            creds_id = str(creds_doc["_id"])
-        
-        client.close()
+        creds_id = str(credentials_doc["_id"])
+
         return creds_id
     except Exception as e:
         logger.error(f"Error storing credentials: {str(e)}")
         logger.error(traceback.format_exc())
         raise
+
+def get_due_posts(start: datetime, end: datetime, status: str = POST_STATUS_PENDING,
+                  limit: int = 0, batch_size: int = 100):
+    """Get posts due in [start, end), oldest first.
+
+    Returns a cursor over the (status, due_at) index; iterate it rather than
+    materialising it when the window may be large.
+    """
+    try:
+        db = get_db()
+        return db.posts.find(
+            {"status": status, "due_at": {"$gte": _as_utc(start), "$lt": _as_utc(end)}},
+            limit=limit,
+            batch_size=batch_size
+        ).sort("due_at", ASCENDING)
+    except Exception as e:
+        logger.error(f"Error getting due posts: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def claim_due_post(owner: str, start: datetime, end: datetime, lease_seconds: int = 300) -> Optional[Dict]:
+    """Atomically claim the oldest claimable post due before end.
+
+    A post is claimable if it is pending and due in [start, end), or if it
+    was claimed by a worker whose lease has expired. The claim moves the
+    post to claimed with the owner and a lease expiry in one
+    find_one_and_update, so concurrent workers never claim the same post.
+    Returns the claimed post, or None when nothing is left to claim.
+    """
+    try:
+        db = get_db()
+        now = datetime.now(timezone.utc)
+        return db.posts.find_one_and_update(
+            {"$or": [
+                {"status": POST_STATUS_PENDING, "due_at": {"$gte": _as_utc(start), "$lt": _as_utc(end)}},
+                {"status": POST_STATUS_CLAIMED, "due_at": {"$lt": _as_utc(end)}, "lease_expires_at": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": POST_STATUS_CLAIMED,
+                    "claimed_by": owner,
+                    "claimed_at": now,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": datetime.now().isoformat()
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("due_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception as e:
+        logger.error(f"Error claiming due post: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def renew_post_lease(post_id, owner: str, lease_seconds: int = 300) -> bool:
+    """Extend the lease of a post claimed by owner, while it is still being processed.
+
+    Returns False if the owner no longer holds the claim, e.g. because its
+    lease expired and another worker reclaimed the post.
+    """
+    try:
+        db = get_db()
+        result = db.posts.update_one(
+            {"_id": post_id, "status": POST_STATUS_CLAIMED, "claimed_by": owner},
+            {"$set": {"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}}
+        )
+        return result.matched_count == 1
+    except Exception as e:
+        logger.error(f"Error renewing post lease: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def mark_post_status(post_id, status: str, error: Optional[str] = None, owner: Optional[str] = None,
+                     fields: Optional[Dict] = None) -> bool:
+    """Set the status of a post, recording the error for failed posts.
+
+    With an owner, the update only applies while that worker still holds the
+    claim, so a worker whose lease expired cannot overwrite the result of
+    the worker that reclaimed the post. fields are set along with the status,
+    e.g. content generated just in time. Returns whether the post was updated.
+    """
+    try:
+        db = get_db()
+        query = {"_id": post_id}
+        if owner is not None:
+            query.update({"status": POST_STATUS_CLAIMED, "claimed_by": owner})
+        update = {**(fields or {}), "status": status, "updated_at": datetime.now().isoformat()}
+        if error is not None:
+            update["error"] = error
+        result = db.posts.update_one(query, {"$set": update})
+        return result.modified_count == 1
+    except Exception as e:
+        logger.error(f"Error updating post status: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def get_unmaterialized_due_times(start: datetime, end: datetime, limit: int = 0,
+                                 max_attempts: int = 2) -> List[datetime]:
+    """Get the due times of pending posts in [start, end) still to be pre-generated, oldest first.
+
+    Posts without content that already had max_attempts pregeneration
+    claims are left out, as claim_post_for_pregeneration skips them.
+    """
+    try:
+        db = get_db()
+        cursor = db.posts.find(
+            {"status": POST_STATUS_PENDING, "due_at": {"$gte": _as_utc(start), "$lt": _as_utc(end)},
+             "content": {"$exists": False}, "pregen_attempts": {"$not": {"$gte": max_attempts}}},
+            {"_id": 0, "due_at": 1},
+            limit=limit,
+            batch_size=1000
+        ).sort("due_at", ASCENDING)
+        return [_as_utc(document["due_at"]) for document in cursor]
+    except Exception as e:
+        logger.error(f"Error getting unmaterialized posts: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def claim_post_for_pregeneration(owner: str, start: datetime, end: datetime,
+                                 lease_seconds: int = 300, max_attempts: int = 2) -> Optional[Dict]:
+    """Atomically claim the next pending post in [start, end) whose content is not generated yet.
+
+    The post stays pending, so it can still be claimed for publishing when
+    it falls due; the separate pregeneration lease only keeps other workers
+    from generating the same content. A lease that expires, e.g. because
+    generation failed, makes the post claimable again, up to max_attempts
+    claims; after that the post is left to be generated when it is due.
+    Returns the claimed post, or None when nothing is left to claim.
+    """
+    try:
+        db = get_db()
+        now = datetime.now(timezone.utc)
+        return db.posts.find_one_and_update(
+            {
+                "status": POST_STATUS_PENDING,
+                "due_at": {"$gte": _as_utc(start), "$lt": _as_utc(end)},
+                "content": {"$exists": False},
+                "pregen_attempts": {"$not": {"$gte": max_attempts}},
+                "$or": [
+                    {"pregen_lease_expires_at": {"$exists": False}},
+                    {"pregen_lease_expires_at": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {"pregen_owner": owner, "pregen_lease_expires_at": now + timedelta(seconds=lease_seconds)},
+                "$inc": {"pregen_attempts": 1}
+            },
+            sort=[("due_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception as e:
+        logger.error(f"Error claiming post for pregeneration: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def store_post_content(post_id, owner: str, content: Dict, fingerprint: str) -> bool:
+    """Store pre-generated content for a post and release its pregeneration lease.
+
+    Only applies while the post is still pending and the owner still holds
+    the lease. Returns whether the content was stored.
+    """
+    try:
+        db = get_db()
+        result = db.posts.update_one(
+            {"_id": post_id, "status": POST_STATUS_PENDING, "pregen_owner": owner},
+            {
+                "$set": {
+                    "content": content,
+                    "content_fingerprint": fingerprint,
+                    "content_generated_at": datetime.now(timezone.utc),
+                    "updated_at": datetime.now().isoformat()
+                },
+                "$unset": {"pregen_owner": "", "pregen_lease_expires_at": ""}
+            }
+        )
+        return result.modified_count == 1
+    except Exception as e:
+        logger.error(f"Error storing post content: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def get_high_water_mark(name: str = "due_posts") -> Optional[datetime]:
+    """Get the end of the last window the trigger fully processed."""
+    try:
+        db = get_db()
+        state = db.trigger_state.find_one({"_id": name})
+        if not state or not state.get("high_water_mark"):
+            return None
+        return _as_utc(state["high_water_mark"])
+    except Exception as e:
+        logger.error(f"Error getting high-water mark: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def set_high_water_mark(value: datetime, name: str = "due_posts") -> None:
+    """Persist the end of the last fully processed trigger window.
+
+    Uses $max so concurrent trigger workers can only move the mark forward.
+    """
+    try:
+        db = get_db()
+        db.trigger_state.update_one(
+            {"_id": name},
+            {"$max": {"high_water_mark": _as_utc(value)}, "$set": {"updated_at": datetime.now().isoformat()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Error setting high-water mark: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC, as pymongo returns them."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def get_content_decision(platform: str, content_type: str) -> Optional[List[str]]:
+    """Get the cached post types for a platform and content type."""
+    try:
+        db = get_db()
+        decision = db.content_decisions.find_one({"_id": f"{platform}|{content_type}"})
+        return decision["post_types"] if decision else None
+    except Exception as e:
+        logger.error(f"Error getting content decision: {str(e)}")
+        logger.error(traceback.format_exc())
+        return None
+
+def store_content_decision(platform: str, content_type: str, post_types: List[str]) -> None:
+    """Cache the post types decided for a platform and content type."""
+    try:
+        db = get_db()
+        db.content_decisions.update_one(
+            {"_id": f"{platform}|{content_type}"},
+            {"$set": {
+                "platform": platform,
+                "content_type": content_type,
+                "post_types": post_types,
+                "updated_at": datetime.now().isoformat()
+            }},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Error storing content decision: {str(e)}")
+        logger.error(traceback.format_exc())
@@ -0,0 +1,229 @@
+import os
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from config.metrics import percentile
+from config.rate_limiter import get_rate_limiter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Send a duplicate of slow LLM calls and use whichever answers first
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Hedge once a call is slower than this percentile of recent calls of its kind
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Calls of a kind observed before it is hedged, and how many recent ones are kept
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+# Never hedge sooner than this, however fast recent calls were
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+# Duplicates allowed per call made, i.e. the cap on extra spend (0.05 = 5%)
+LLM_HEDGE_BUDGET_RATIO = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.05"))
+# Duplicates that can be saved up for a burst of slow calls
+LLM_HEDGE_BUDGET_BURST = float(os.getenv("LLM_HEDGE_BUDGET_BURST", "10"))
+LLM_HEDGE_MAX_WORKERS = int(os.getenv("LLM_HEDGE_MAX_WORKERS", "32"))
+
+# Prompt type of calls made without one
+DEFAULT_PROMPT_TYPE = "default"
+
+class LatencyTracker:
+    """Recent latencies of successful provider calls, per (model, prompt type).
+
+    Keeps a sliding window per key, so the percentiles follow the provider
+    as it speeds up or slows down.
+    """
+
+    def __init__(self, window: int = LLM_HEDGE_WINDOW):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Tuple[str, str], seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: Tuple[str, str], pct: float,
+                   min_samples: int = LLM_HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None until min_samples are seen."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < min_samples:
+                return None
+            samples = list(samples)
+        return percentile(samples, pct)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            f"{model}:{prompt_type}": {
+                "samples": len(self._samples[(model, prompt_type)]),
+                "p50": self.percentile((model, prompt_type), 50, 1),
+                "p95": self.percentile((model, prompt_type), 95, 1),
+                "p99": self.percentile((model, prompt_type), 99, 1),
+            }
+            for model, prompt_type in keys
+        }
+
+class HedgeBudget:
+    """Token bucket that earns ratio of a duplicate per call made."""
+
+    def __init__(self, ratio: float = LLM_HEDGE_BUDGET_RATIO, burst: float = LLM_HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+class _HedgeStats:
+    FIELDS = ("calls", "hedged", "hedge_wins", "budget_denied", "limiter_busy")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in self.FIELDS}
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+tracker = LatencyTracker()
+budget = HedgeBudget()
+stats = _HedgeStats()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LLM_HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+    return _executor
+
+def _hedge_delay(key: Tuple[str, str]) -> Optional[float]:
+    """Seconds to wait before hedging a call, or None if it should not be hedged."""
+    if not LLM_HEDGE_ENABLED:
+        return None
+    threshold = tracker.percentile(key, LLM_HEDGE_PERCENTILE)
+    if threshold is None:
+        return None
+    return max(threshold, LLM_HEDGE_MIN_DELAY_SECONDS)
+
+def record_latency(model: str, prompt_type: Optional[str], seconds: float) -> None:
+    """Record how long a successful provider call took, excluding any wait before it was sent."""
+    tracker.record((model, prompt_type or DEFAULT_PROMPT_TYPE), seconds)
+
+def _may_hedge() -> bool:
+    """Spend the budget on a duplicate, unless callers are queued at the rate limiter."""
+    if get_rate_limiter().queued():
+        # The slow call may still be waiting its turn, and a duplicate would only join the queue
+        stats.record("limiter_busy")
+        return False
+    if not budget.try_spend():
+        stats.record("budget_denied")
+        return False
+    return True
+
+def hedged_call(model: str, fn: Callable[[], Any], prompt_type: Optional[str] = None) -> Any:
+    """Call fn, sending a duplicate if it is slower than usual for its kind.
+
+    Once the call has run longer than LLM_HEDGE_PERCENTILE of recent
+    provider calls with the same model and prompt type, as recorded by
+    record_latency, fn is called again in parallel and the first successful
+    result is returned. No duplicate is sent while callers are queued at the
+    rate limiter, or once the budget is spent. A blocking call cannot be
+    cancelled, so the loser runs to completion in the background and its
+    result is dropped.
+    """
+    key = (model, prompt_type or DEFAULT_PROMPT_TYPE)
+    stats.record("calls")
+    budget.earn()
+    delay = _hedge_delay(key)
+    if delay is None:
+        return fn()
+
+    executor = _get_executor()
+    # Each attempt runs in a copy of this context, so the rate limiter's context variables carry over
+    primary = executor.submit(contextvars.copy_context().run, fn)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    if not _may_hedge():
+        return primary.result()
+
+    stats.record("hedged")
+    logger.info(f"Hedging {key[1]} call to {model} after {delay:.1f}s")
+    hedge = executor.submit(contextvars.copy_context().run, fn)
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    stats.record("hedge_wins")
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+async def ahedged_call(model: str, fn: Callable[[], Awaitable[Any]], prompt_type: Optional[str] = None) -> Any:
+    """Async version of hedged_call; the losing attempt is cancelled."""
+    key = (model, prompt_type or DEFAULT_PROMPT_TYPE)
+    stats.record("calls")
+    budget.earn()
+    delay = _hedge_delay(key)
+    if delay is None:
+        return await fn()
+
+    primary = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+    if not _may_hedge():
+        return await primary
+
+    stats.record("hedged")
+    logger.info(f"Hedging {key[1]} call to {model} after {delay:.1f}s")
+    hedge = asyncio.ensure_future(fn())
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        stats.record("hedge_wins")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """Get hedging counters and the tracked latency percentiles."""
+    return {"enabled": LLM_HEDGE_ENABLED, **stats.as_dict(), "latency": tracker.stats()}
@@ -0,0 +1,103 @@
+import os
+import logging
+import traceback
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from config.database import get_db
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Set MONGO_VERIFY_INDEXES=false to skip the explain() self-check at startup
+VERIFY_INDEXES = os.getenv("MONGO_VERIFY_INDEXES", "true").lower() == "true"
+
+# Indexes every collection must have. create_indexes() is a no-op for an
+# index that already exists with the same name and spec, so this can run on
+# every startup.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "setups": [
+        IndexModel([("user_uuid", ASCENDING)], name="user_uuid_unique", unique=True),
+    ],
+    "credentials": [
+        IndexModel([("user_uuid", ASCENDING)], name="user_uuid_unique", unique=True),
+    ],
+    "schedules": [
+        IndexModel([("user_uuid", ASCENDING)], name="user_uuid"),
+    ],
+    "jobs": [
+        IndexModel([("email", ASCENDING), ("kind", ASCENDING), ("created_at", DESCENDING)], name="email_kind_created_at"),
+    ],
+    "posts": [
+        IndexModel([("status", ASCENDING), ("due_at", ASCENDING)], name="status_due_at"),
+        IndexModel([("schedule_id", ASCENDING)], name="schedule_id"),
+    ],
+}
+
+# Hot queries and the index each one is expected to use:
+# (collection, filter, index name)
+HOT_QUERIES: List[Tuple[str, Dict, str]] = [
+    ("users", {"email": "index-check@example.com"}, "email_unique"),
+    ("setups", {"user_uuid": "index-check"}, "user_uuid_unique"),
+    ("credentials", {"user_uuid": "index-check"}, "user_uuid_unique"),
+    ("posts", {"status": "pending", "due_at": {"$gte": datetime(1970, 1, 1), "$lt": datetime(1970, 1, 2)}},
+     "status_due_at"),
+]
+
+class IndexVerificationError(RuntimeError):
+    """Raised when a hot query is not served by its expected index."""
+
+def ensure_indexes(db=None) -> None:
+    """Create all application indexes. Safe to call repeatedly."""
+    db = db if db is not None else get_db()
+    for collection, models in INDEXES.items():
+        try:
+            names = db[collection].create_indexes(models)
+            logger.info(f"Ensured indexes on {collection}: {', '.join(names)}")
+        except Exception as e:
+            logger.error(f"Error creating indexes on {collection}: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+def _plan_stages(plan: Dict) -> List[Dict]:
+    """Flatten a query plan tree into the list of its stages."""
+    stages = [plan]
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+def verify_query_plans(db=None) -> None:
+    """Check with explain() that every hot query uses its index.
+
+    Raises IndexVerificationError listing each query that falls back to a
+    collection scan or picks a different index.
+    """
+    db = db if db is not None else get_db()
+    failures = []
+    for collection, query, index_name in HOT_QUERIES:
+        explain = db[collection].find(query).explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        used = [stage.get("indexName") for stage in stages if stage.get("stage") == "IXSCAN"]
+        if index_name not in used:
+            plan = " -> ".join(stage.get("stage", "?") for stage in stages)
+            failures.append(f"{collection} {query} expected index '{index_name}', got plan {plan}")
+
+    if failures:
+        for failure in failures:
+            logger.error(f"Query plan check failed: {failure}")
+        raise IndexVerificationError("; ".join(failures))
+    logger.info("Query plan check passed for %d hot queries", len(HOT_QUERIES))
+
+def bootstrap_indexes(db=None, verify: Optional[bool] = None) -> None:
+    """Create indexes and, unless disabled, verify the hot query plans."""
+    ensure_indexes(db)
+    if VERIFY_INDEXES if verify is None else verify:
+        verify_query_plans(db)
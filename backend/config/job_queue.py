@@ -0,0 +1,259 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from config.async_database import create_job, update_job, get_job, heartbeat_jobs, fail_orphaned_jobs
+from config.crew_executor import CrewCapacityError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of jobs executed concurrently by this process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# How often SSE subscribers re-read a job while it is running
+JOB_EVENT_POLL_SECONDS = float(os.getenv("JOB_EVENT_POLL_SECONDS", "1.0"))
+# How long a job waits before retrying when the crew executor is full
+JOB_CAPACITY_RETRY_SECONDS = float(os.getenv("JOB_CAPACITY_RETRY_SECONDS", "5"))
+# How often a process marks its active jobs as alive, and how long without
+# a heartbeat before a queued or running job is failed as orphaned
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_ORPHAN_SECONDS = float(os.getenv("JOB_ORPHAN_SECONDS", "60"))
+
+# Job status values
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+ACTIVE_STATUSES = [JOB_QUEUED, JOB_RUNNING]
+
+JobHandler = Callable[[Dict, Callable[[float, str], Awaitable[None]], Callable[[str], None]], Awaitable[Any]]
+
+def _sse(event: str, data: Any) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def serialize_job(job: Dict) -> Dict:
+    """Shape a stored job for API responses and events."""
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job.get("progress", 0.0),
+        "message": job.get("message"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+class JobQueue:
+    """In-process queue that runs registered job handlers on worker tasks.
+
+    Jobs are persisted in the jobs collection at every state change, so a
+    client that reconnects, or polls a different API process, sees the same
+    status and result. The queue itself is local to the process, so jobs
+    still queued or running when the process stops are not resumed. Each
+    process sends heartbeats for its active jobs, and jobs whose process
+    stopped sending them are failed, at startup and periodically after.
+    Text a handler streams with emit is kept in memory while the job runs
+    and forwarded to stream() subscribers in this process.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        # Jobs queued or running in this process, kept alive by _heartbeat
+        self._active: Set[str] = set()
+        # Text emitted so far by running jobs, and the queues of their stream() subscribers
+        self._emitted: Dict[str, List[str]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the coroutine that executes jobs of a kind.
+
+        The handler receives the job payload, a report(progress, message)
+        coroutine for progress updates and an emit(text) function for
+        streamed output, and returns the job result.
+        """
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"Started job queue with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, email: str, payload: Dict) -> Dict:
+        """Persist a new job and queue it for execution."""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started")
+        now = datetime.now().isoformat()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "email": email,
+            "payload": payload,
+            "status": JOB_QUEUED,
+            "progress": 0.0,
+            "message": "Queued",
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "heartbeat_at": datetime.now(timezone.utc)
+        }
+        await create_job(job)
+        self._active.add(job["_id"])
+        await self._queue.put(job)
+        return job
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Usually a database error while recording the job; keep the worker alive
+                logger.error(f"Job worker {index} could not run job {job['_id']}: {str(e)}")
+                logger.error(traceback.format_exc())
+                try:
+                    await update_job(job["_id"], {"status": JOB_FAILED, "message": "Failed", "error": str(e)})
+                except Exception:
+                    pass  # Failed as orphaned once its heartbeats stop
+            finally:
+                self._active.discard(job["_id"])
+                self._emitted.pop(job["_id"], None)
+                for subscriber in self._subscribers.get(job["_id"], ()):
+                    subscriber.put_nowait(None)
+                self._queue.task_done()
+
+    async def _heartbeat(self) -> None:
+        """Keep this process's jobs alive and fail those of processes that stopped."""
+        while True:
+            try:
+                if self._active:
+                    await heartbeat_jobs(list(self._active))
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_ORPHAN_SECONDS)
+                failed = await fail_orphaned_jobs(ACTIVE_STATUSES, cutoff, {
+                    "status": JOB_FAILED, "message": "Failed", "error": "The server stopped while the job was running"
+                })
+                if failed:
+                    logger.warning(f"Failed {failed} orphaned jobs")
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+
+    async def _run(self, job: Dict) -> None:
+        job_id = job["_id"]
+
+        async def report(progress: float, message: str) -> None:
+            await update_job(job_id, {"progress": max(0.0, min(1.0, progress)), "message": message})
+
+        def emit(text: str) -> None:
+            self._emitted.setdefault(job_id, []).append(text)
+            for subscriber in self._subscribers.get(job_id, ()):
+                subscriber.put_nowait(text)
+
+        await update_job(job_id, {"status": JOB_RUNNING, "progress": 0.05, "message": "Running"})
+        while True:
+            try:
+                result = await self._handlers[job["kind"]](job["payload"], report, emit)
+                await update_job(job_id, {
+                    "status": JOB_SUCCEEDED, "progress": 1.0, "message": "Completed", "result": result
+                })
+                return
+            except CrewCapacityError:
+                # The sync endpoints share the crew executor; wait for a slot
+                await report(0.05, "Waiting for capacity")
+                await asyncio.sleep(JOB_CAPACITY_RETRY_SECONDS)
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                logger.error(traceback.format_exc())
+                detail = getattr(e, "detail", None) or str(e)
+                await update_job(job_id, {"status": JOB_FAILED, "message": "Failed", "error": detail})
+                return
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """Get the persisted state of a job."""
+        return await get_job(job_id)
+
+    async def events(self, job_id: str) -> AsyncIterator[str]:
+        """Yield server-sent events for each change of a job until it ends."""
+        last_update = None
+        while True:
+            job = await get_job(job_id)
+            if job is None:
+                yield _sse("error", {"detail": "Job not found"})
+                return
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                event = "done" if job["status"] in TERMINAL_STATUSES else "progress"
+                yield _sse(event, serialize_job(job))
+                if event == "done":
+                    return
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+    async def stream(self, job_id: str) -> AsyncIterator[str]:
+        """Yield a job's emitted text as server-sent "token" events, then its result.
+
+        Starts with a "start" event carrying the job id, so a client that
+        loses the stream can still wait for the job, and replays the text
+        emitted before it subscribed. Ends with "done" and the job result,
+        or "error". Closing the stream does not stop the job. Live text is
+        only available from the process running the job.
+        """
+        subscriber: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(subscriber)
+        try:
+            yield _sse("start", {"job_id": job_id})
+            emitted = "".join(self._emitted.get(job_id, []))
+            if emitted:
+                yield _sse("token", {"text": emitted})
+            while True:
+                try:
+                    text = await asyncio.wait_for(subscriber.get(), timeout=JOB_EVENT_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    text = None
+                if text:
+                    yield _sse("token", {"text": text})
+                    continue
+                # The job ended, or check whether it did elsewhere
+                job = await get_job(job_id)
+                if job is None:
+                    yield _sse("error", {"detail": "Job not found"})
+                    return
+                if job["status"] == JOB_SUCCEEDED:
+                    yield _sse("done", job.get("result"))
+                    return
+                if job["status"] == JOB_FAILED:
+                    yield _sse("error", {"detail": job.get("error")})
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+# Shared queue for the API process
+job_queue = JobQueue()
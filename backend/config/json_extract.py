@@ -0,0 +1,232 @@
+import re
+import ast
+import json
+import logging
+from typing import Any, Iterable, Iterator, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Fenced code blocks, e.g. ```json ... ```
+FENCE_PATTERN = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+class JSONExtractionError(ValueError):
+    """Raised when no valid JSON value of the expected type is found in a reply."""
+
+def repair_json(text: str) -> str:
+    """Fix the defects LLMs most often put in JSON.
+
+    Single-quoted strings become double-quoted, trailing commas before a
+    closing bracket are dropped, and Python's True/False/None become JSON
+    literals. Text inside strings is left untouched.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        char = text[i]
+        if char == '"' or char == "'":
+            # Copy a string, re-quoting it with double quotes
+            quote = char
+            out.append('"')
+            i += 1
+            while i < n and text[i] != quote:
+                if text[i] == "\\" and i + 1 < n:
+                    escaped = text[i + 1]
+                    out.append("'" if escaped == "'" else "\\" + escaped)
+                    i += 2
+                    continue
+                out.append('\\"' if text[i] == '"' else text[i])
+                i += 1
+            out.append('"')
+            i += 1
+        elif char == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] in "}]":
+                i += 1  # Drop the trailing comma
+            else:
+                out.append(char)
+                i += 1
+        elif char.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(PYTHON_LITERALS.get(word, word))
+            i = j
+        else:
+            out.append(char)
+            i += 1
+    return "".join(out)
+
+def loads_lenient(text: str) -> Any:
+    """Parse JSON, retrying with repair_json and then as a Python literal."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return json.loads(repair_json(text))
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError) as e:
+        raise JSONExtractionError(f"Invalid JSON: {str(e)}")
+
+def _scan_value(text: str, start: int) -> Optional[int]:
+    """Find the end (exclusive) of the bracketed value opening at start, or None if it never closes."""
+    depth = 0
+    quote = None
+    i = start
+    n = len(text)
+    while i < n:
+        char = text[i]
+        if quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return None
+
+def _matches(value: Any, expect: Optional[type]) -> bool:
+    return expect is None or isinstance(value, expect)
+
+def extract_json(text: str, expect: Optional[type] = None) -> Any:
+    """Find and parse the first JSON object or array in an LLM reply.
+
+    The reply may wrap the JSON in markdown fences or prose and may contain
+    the defects handled by repair_json. expect (dict or list) skips values of
+    the other type. Raises JSONExtractionError if nothing valid is found.
+    """
+    if not isinstance(text, str):
+        if _matches(text, expect):
+            return text
+        raise JSONExtractionError(f"Expected {expect.__name__}, got {type(text).__name__}")
+
+    # Fast path: the whole reply is valid JSON
+    stripped = text.strip()
+    try:
+        value = json.loads(stripped)
+        if _matches(value, expect) and isinstance(value, (dict, list)):
+            return value
+    except ValueError:
+        pass
+
+    # Prefer fenced blocks, then the reply as a whole
+    candidates = [match.group(1) for match in FENCE_PATTERN.finditer(text)] + [text]
+    openers = "{" if expect is dict else "[" if expect is list else "{["
+    for candidate in candidates:
+        for start, char in enumerate(candidate):
+            if char not in openers:
+                continue
+            end = _scan_value(candidate, start)
+            if end is None:
+                continue
+            try:
+                value = loads_lenient(candidate[start:end])
+            except JSONExtractionError:
+                continue
+            if _matches(value, expect):
+                return value
+    raise JSONExtractionError(f"No valid JSON {expect.__name__ if expect else 'value'} found in reply")
+
+class JSONArrayStream:
+    """Incrementally parse the first JSON array in a stream of text chunks.
+
+    feed() returns each element of the array as soon as it is complete, so
+    callers can use finished items while the rest of the reply is still
+    being generated, or salvage them from a truncated reply. Elements that
+    cannot be parsed even after repair are skipped and counted in invalid.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self.invalid = 0
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._quote = None
+        self._escape = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Add text and return the elements completed by it."""
+        items = []
+        if self.done:
+            return items
+        self.buffer += chunk
+        text = self.buffer
+        while self._pos < len(text):
+            char = text[self._pos]
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == self._quote:
+                    self._quote = None
+            elif char in "\"'":
+                self._quote = char
+                if self._item_start is None:
+                    self._item_start = self._pos
+            elif char in "[{":
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = self._pos
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_item(self._pos, items)
+                    self.done = True
+                    self._pos += 1
+                    break
+            elif char == "," and self._depth == 1:
+                self._finish_item(self._pos, items)
+            elif not char.isspace() and self._item_start is None:
+                self._item_start = self._pos
+            self._pos += 1
+        return items
+
+    def _finish_item(self, end: int, items: List[Any]) -> None:
+        if self._item_start is None:
+            return
+        fragment = self.buffer[self._item_start:end].strip()
+        self._item_start = None
+        if not fragment:
+            return
+        try:
+            items.append(loads_lenient(fragment))
+        except JSONExtractionError:
+            self.invalid += 1
+            logger.warning(f"Skipping invalid array element: {fragment[:80]}")
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Yield the elements of the first JSON array in a stream of text chunks as they complete.
+
+    The stream is read to its end even after the array closes, so an LLM
+    stream finishes normally and its usage is recorded.
+    """
+    stream = JSONArrayStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+import litellm
+from litellm.integrations.custom_logger import CustomLogger
+from dotenv import load_dotenv
+from langchain.chat_models import ChatLiteLLM
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from config.llm_cache import install_llm_cache
+from config.rate_limiter import (
+    LLM_OUTPUT_TOKENS_ESTIMATE,
+    arate_limited,
+    estimate_tokens,
+    get_rate_limiter,
+    in_limited_call,
+    rate_limited,
+)
+from config.routing import route_settings, route_stats
+from config.hedging import DEFAULT_PROMPT_TYPE, ahedged_call, hedged_call, record_latency
+from config.resilience import (
+    acall_with_resilience,
+    aiter_with_resilience,
+    call_with_resilience,
+    iter_with_resilience,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# LLM gateway settings
+LLM_BACKEND = os.getenv("LLM_BACKEND", "litellm")  # litellm or fake
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini/gemini-2.0-flash")
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("GOOGLE_API_KEY")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+# JSON file with a list of canned replies for the fake backend
+LLM_FAKE_RESPONSES_FILE = os.getenv("LLM_FAKE_RESPONSES_FILE")
+
+# Every LLM call in the process shares this limit, whichever agent makes it
+_concurrency = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+async def _acquire_slot() -> None:
+    """Take a concurrency slot from async code without blocking the event loop.
+
+    Polls instead of waiting in an executor thread, so a cancelled waiter
+    never acquires a slot after it has gone and no threads are tied up.
+    """
+    delay = 0.005
+    while not _concurrency.acquire(blocking=False):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+def estimate_message_tokens(messages: Any) -> int:
+    """Estimate the tokens of a call from its prompt plus the expected output."""
+    if isinstance(messages, list):
+        text = "".join(str(getattr(m, "content", None) or (m.get("content") if isinstance(m, dict) else m) or "")
+                       for m in messages)
+    else:
+        text = str(messages or "")
+    return estimate_tokens(text) + LLM_OUTPUT_TOKENS_ESTIMATE
+
+def _usage(result: Any) -> Dict:
+    """Get the token usage reported for a call, empty if the provider returned none."""
+    return (getattr(result, "llm_output", None) or {}).get("token_usage") or {}
+
+def _usage_tokens(result: Any) -> Optional[int]:
+    """Get the total tokens reported for a call, if the provider returned usage."""
+    return _usage(result).get("total_tokens")
+
+class GatewayChatLiteLLM(ChatLiteLLM):
+    """ChatLiteLLM whose provider calls go through the gateway's global limits.
+
+    Each attempt first waits for the shared RPM/TPM rate limiter, then takes
+    a concurrency slot, so backoff between retries never holds a slot.
+    Retries, the circuit breaker and the call deadline come from
+    config.resilience; ChatLiteLLM's own retries are disabled. Cache hits
+    are answered by LangChain before _generate is reached, so they never
+    count against any of these. Slow non-streamed calls may be hedged with
+    a duplicate (config.hedging), each copy with its own retries; hedging
+    learns from the provider call alone, timed after the rate limiter and
+    the slot. A streamed call holds its slot until the stream ends, is only
+    retried before its first chunk and is never hedged.
+
+    route names the call site the model was built for (see get_route_llm);
+    latency and token usage are recorded per route, and hedging tracks
+    latency per route.
+    """
+
+    route: Optional[str] = None
+
+    def _route(self) -> str:
+        return self.route or DEFAULT_PROMPT_TYPE
+
+    def _generate(self, messages: Any, *args: Any, **kwargs: Any):
+        def attempt(timeout: float):
+            with rate_limited(estimate_message_tokens(messages)) as grant, _concurrency:
+                sent = time.monotonic()
+                result = super(GatewayChatLiteLLM, self)._generate(
+                    messages, *args, **{**kwargs, "request_timeout": min(timeout, LLM_TIMEOUT_SECONDS)})
+                record_latency(self.model, self.route, time.monotonic() - sent)
+                grant.settle(_usage_tokens(result))
+                return result
+        started = time.monotonic()
+        try:
+            result = hedged_call(self.model, lambda: call_with_resilience(attempt), prompt_type=self.route)
+        except Exception:
+            route_stats.record_failure(self._route())
+            raise
+        route_stats.record(self._route(), time.monotonic() - started, _usage(result))
+        return result
+
+    async def _agenerate(self, messages: Any, *args: Any, **kwargs: Any):
+        async def attempt(timeout: float):
+            async with arate_limited(estimate_message_tokens(messages)) as grant:
+                await _acquire_slot()
+                try:
+                    sent = time.monotonic()
+                    result = await super(GatewayChatLiteLLM, self)._agenerate(
+                        messages, *args, **{**kwargs, "request_timeout": min(timeout, LLM_TIMEOUT_SECONDS)})
+                    record_latency(self.model, self.route, time.monotonic() - sent)
+                finally:
+                    _concurrency.release()
+                await grant.asettle(_usage_tokens(result))
+                return result
+        started = time.monotonic()
+        try:
+            result = await ahedged_call(self.model, lambda: acall_with_resilience(attempt), prompt_type=self.route)
+        except Exception:
+            route_stats.record_failure(self._route())
+            raise
+        route_stats.record(self._route(), time.monotonic() - started, _usage(result))
+        return result
+
+    def _stream(self, messages: Any, *args: Any, **kwargs: Any):
+        def attempt(timeout: float):
+            with rate_limited(estimate_message_tokens(messages)), _concurrency:
+                yield from super(GatewayChatLiteLLM, self)._stream(
+                    messages, *args, **{**kwargs, "request_timeout": min(timeout, LLM_TIMEOUT_SECONDS)})
+        started = time.monotonic()
+        try:
+            yield from iter_with_resilience(attempt)
+        except Exception:
+            route_stats.record_failure(self._route())
+            raise
+        route_stats.record(self._route(), time.monotonic() - started)
+
+    async def _astream(self, messages: Any, *args: Any, **kwargs: Any):
+        async def attempt(timeout: float):
+            async with arate_limited(estimate_message_tokens(messages)):
+                await _acquire_slot()
+                try:
+                    async for chunk in super(GatewayChatLiteLLM, self)._astream(
+                            messages, *args, **{**kwargs, "request_timeout": min(timeout, LLM_TIMEOUT_SECONDS)}):
+                        yield chunk
+                finally:
+                    _concurrency.release()
+        started = time.monotonic()
+        try:
+            async for chunk in aiter_with_resilience(attempt):
+                yield chunk
+        except Exception:
+            route_stats.record_failure(self._route())
+            raise
+        route_stats.record(self._route(), time.monotonic() - started)
+
+class _RateLimitCallback(CustomLogger):
+    """LiteLLM callback that rate limits calls made outside the gateway model.
+
+    CrewAI agents call LiteLLM directly with the model name, bypassing
+    GatewayChatLiteLLM, so their calls are limited here before they are
+    sent. Calls already granted by the gateway are skipped. CrewAI calls
+    are synchronous and run in worker threads, so blocking here is safe.
+    """
+
+    def log_pre_api_call(self, model, messages, kwargs):
+        if not in_limited_call():
+            get_rate_limiter().acquire(estimate_message_tokens(messages))
+
+_llms: Dict[str, Any] = {}
+_llms_lock = threading.Lock()
+_http_installed = False
+
+def _install_http_clients() -> None:
+    """Give LiteLLM pooled keep-alive HTTP clients shared by every model, and its rate limit callback."""
+    global _http_installed
+    if _http_installed:
+        return
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS
+    )
+    litellm.client_session = httpx.Client(limits=limits, timeout=LLM_TIMEOUT_SECONDS)
+    litellm.aclient_session = httpx.AsyncClient(limits=limits, timeout=LLM_TIMEOUT_SECONDS)
+    litellm.callbacks.append(_RateLimitCallback())
+    _http_installed = True
+
+def _load_fake_responses() -> List[str]:
+    """Load canned replies for the fake backend."""
+    if LLM_FAKE_RESPONSES_FILE:
+        with open(LLM_FAKE_RESPONSES_FILE) as f:
+            return json.load(f)
+    return ['["Text"]']
+
+def _build_llm(model: str, **params: Any):
+    """Construct the chat model for the configured backend."""
+    if LLM_BACKEND == "fake":
+        return FakeListChatModel(responses=_load_fake_responses())
+    if LLM_BACKEND != "litellm":
+        raise ValueError(f"Unknown LLM backend: {LLM_BACKEND}")
+    _install_http_clients()
+    return GatewayChatLiteLLM(
+        model=model,
+        api_key=LLM_API_KEY,
+        request_timeout=LLM_TIMEOUT_SECONDS,
+        # Retries are handled by config.resilience
+        max_retries=1,
+        **params
+    )
+
+def get_llm(model: Optional[str] = None, **params: Any):
+    """Get the shared chat model for a model name.
+
+    Models are built lazily on first use and reused for the life of the
+    process, so every agent shares one HTTP connection pool and one set of
+    concurrency limits. Extra params (temperature, max_tokens, ...) select a
+    separate instance for that combination.
+    """
+    model = model or LLM_MODEL
+    key = json.dumps([model, params], sort_keys=True, default=str)
+    llm = _llms.get(key)
+    if llm is not None:
+        return llm
+    with _llms_lock:
+        llm = _llms.get(key)
+        if llm is None:
+            install_llm_cache()
+            llm = _build_llm(model, **params)
+            _llms[key] = llm
+            logger.info(f"Created {LLM_BACKEND} LLM for {model}")
+    return llm
+
+def get_route_llm(route: str):
+    """Get the shared chat model for a call site from the routing table.
+
+    Each route maps to a model tier with its own max_tokens and
+    temperature (config.routing), so short classification calls use a
+    fast, cheap model and long-form generation a stronger one.
+    """
+    settings = route_settings(route)
+    return get_llm(settings["model"], route=route, **settings["params"])
@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cache settings
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")  # sqlite, memory or none
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "llm_cache.sqlite3")
+)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so prompts differing only in indentation share an entry."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+def make_cache_key(prompt: str, llm_string: str) -> str:
+    """Key an LLM call on its normalized prompt and its model and parameters.
+
+    llm_string is built by LangChain from the model name and every
+    invocation parameter (temperature, max tokens, ...), so a change to
+    any of them produces a different key.
+    """
+    payload = json.dumps([llm_string, normalize_prompt(prompt)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, name: str, count: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+class MemoryLRUCache(BaseCache):
+    """In-memory LLM cache with LRU size eviction and a TTL."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl_seconds: int = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = make_cache_key(prompt, llm_string)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.stats.record("evictions")
+                entry = None
+            if entry is None:
+                self.stats.record("misses")
+                return None
+            self._entries.move_to_end(key)
+        self.stats.record("hits")
+        return entry[1]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = make_cache_key(prompt, llm_string)
+        with self._lock:
+            self._entries[key] = (time.time(), return_val)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.record("evictions")
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteLLMCache(BaseCache):
+    """Disk-backed LLM cache shared by every process on the host.
+
+    Entries expire after the TTL, and once the table grows past max_entries
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = make_cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.stats.record("evictions")
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        if row is None:
+            self.stats.record("misses")
+            return None
+        try:
+            generations = loads(row[0])
+        except Exception as e:
+            logger.warning(f"Discarding unreadable LLM cache entry: {str(e)}")
+            self.stats.record("misses")
+            return None
+        self.stats.record("hits")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = make_cache_key(prompt, llm_string)
+        now = time.time()
+        value = dumps(list(return_val))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (excess,)
+                )
+                self.stats.record("evictions", excess)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+_install_lock = threading.Lock()
+
+def install_llm_cache(backend: Optional[str] = None) -> Optional[BaseCache]:
+    """Install the process-wide LLM cache used by every ChatLiteLLM instance.
+
+    LangChain consults the global cache for any model without a cache of its
+    own, so installing once covers all agents. Calling this again keeps the
+    cache that is already installed.
+    """
+    with _install_lock:
+        cache = get_llm_cache()
+        if cache is not None:
+            return cache
+        backend = (backend or LLM_CACHE_BACKEND).lower()
+        if backend == "none":
+            return None
+        if backend == "memory":
+            cache = MemoryLRUCache()
+        elif backend == "sqlite":
+            cache = SQLiteLLMCache()
+        else:
+            raise ValueError(f"Unknown LLM cache backend: {backend}")
+        set_llm_cache(cache)
+        logger.info(f"Installed {backend} LLM cache")
+        return cache
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters of the installed LLM cache."""
+    cache = get_llm_cache()
+    stats = getattr(cache, "stats", None)
+    return stats.as_dict() if stats is not None else {}
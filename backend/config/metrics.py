@@ -0,0 +1,9 @@
+import math
+from typing import Iterable
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Nearest-rank percentile of some numbers, or 0.0 if there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
@@ -0,0 +1,247 @@
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, NamedTuple, Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from config.timeutils import parse_post_datetime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class Platform(str, Enum):
+    INSTAGRAM = "Instagram"
+    LINKEDIN = "LinkedIn"
+    TWITTER = "Twitter"
+    FACEBOOK = "Facebook"
+    TIKTOK = "TikTok"
+    YOUTUBE = "YouTube"
+    PINTEREST = "Pinterest"
+    OTHER = "Other"
+
+    @classmethod
+    def _missing_(cls, value: Any) -> "Platform":
+        key = str(value).strip().lower()
+        for member in cls:
+            if member.value.lower() == key:
+                return member
+        return PLATFORM_ALIASES.get(key, cls.OTHER)
+
+PLATFORM_ALIASES = {
+    "x": Platform.TWITTER,
+    "twitter/x": Platform.TWITTER,
+    "ig": Platform.INSTAGRAM,
+    "fb": Platform.FACEBOOK,
+}
+
+class ContentType(str, Enum):
+    POST = "Post"
+    TEXT = "Text"
+    ARTICLE = "Article"
+    BLOG = "Blog"
+    NEWSLETTER = "Newsletter"
+    THREAD = "Thread"
+    POLL = "Poll"
+    QUOTE = "Quote"
+    IMAGE = "Image"
+    INFOGRAPHIC = "Infographic"
+    CAROUSEL = "Carousel"
+    PIN = "Pin"
+    STORY = "Story"
+    REEL = "Reel"
+    VIDEO = "Video"
+    SHORT = "Short"
+    LIVE = "Live"
+    OTHER = "Other"
+
+    @classmethod
+    def _missing_(cls, value: Any) -> "ContentType":
+        key = str(value).strip().lower()
+        for member in cls:
+            # Accept case differences and plurals ("reels", "stories")
+            name = member.value.lower()
+            if key in (name, name + "s") or (name.endswith("y") and key == name[:-1] + "ies"):
+                return member
+        return cls.OTHER
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes (as returned by MongoDB) as UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _object_id(value: Optional[str]) -> Any:
+    """Convert an id string back to an ObjectId where it is one."""
+    return ObjectId(value) if value and ObjectId.is_valid(value) else value
+
+def _unknown_label(enum_cls: type, value: Any) -> Optional[str]:
+    """The original text of a value that enum_cls can only store as OTHER, else None."""
+    if not isinstance(value, str) or not value.strip() or isinstance(value, enum_cls):
+        return None
+    if enum_cls(value) != enum_cls.OTHER or value.strip().lower() == enum_cls.OTHER.value.lower():
+        return None
+    return value.strip()
+
+def _input_fingerprint(platform: str, content_type: str, pillar_or_campaign: str, description: str) -> str:
+    inputs = [platform, content_type, pillar_or_campaign, description]
+    return hashlib.sha1(json.dumps(inputs).encode("utf-8")).hexdigest()
+
+class PostRecord(NamedTuple):
+    """Compact, immutable view of a stored post for the trigger's per-post work.
+
+    A tuple without validation, so it is cheap to build from documents
+    already written through Post, as the trigger does several times for
+    every post it claims.
+    """
+    id: Optional[str]
+    platform: Platform
+    platform_raw: Optional[str]
+    content_type: ContentType
+    content_type_raw: Optional[str]
+    pillar_or_campaign: str
+    description: str
+    due_at: Optional[datetime]
+    content: Optional[Dict[str, Any]]
+    content_fingerprint: Optional[str]
+    content_generated_at: Optional[datetime]
+
+    @classmethod
+    def from_bson(cls, document: Dict) -> "PostRecord":
+        platform = document["platform"]
+        content_type = document.get("content_type") or ContentType.POST.value
+        due_at = document.get("due_at")
+        generated_at = document.get("content_generated_at")
+        return cls(
+            str(document["_id"]) if "_id" in document else None,
+            Platform(platform),
+            document.get("platform_raw") or _unknown_label(Platform, platform),
+            ContentType(content_type),
+            document.get("content_type_raw") or _unknown_label(ContentType, content_type),
+            document.get("pillar_or_campaign", ""),
+            document.get("description", ""),
+            _as_utc(due_at) if due_at else None,
+            document.get("content"),
+            document.get("content_fingerprint"),
+            _as_utc(generated_at) if generated_at else None
+        )
+
+    @property
+    def platform_label(self) -> str:
+        return self.platform_raw or self.platform.value
+
+    @property
+    def content_type_label(self) -> str:
+        return self.content_type_raw or self.content_type.value
+
+    def input_fingerprint(self) -> str:
+        """Same as Post.input_fingerprint."""
+        return _input_fingerprint(self.platform_label, self.content_type_label,
+                                  self.pillar_or_campaign, self.description)
+
+class Post(BaseModel):
+    """A scheduled social media post, validated once where it enters the system.
+
+    Field names match the stored documents and the API, so the planner's
+    "datetime" text is exposed as local_datetime under its original name.
+    due_at is the UTC posting time, parsed from that text when not given.
+    content holds the output of each content system once generated, with
+    the fingerprint of the fields it was generated from. A platform or
+    content type without a member of its enum is stored as OTHER, with its
+    original text kept in platform_raw or content_type_raw.
+    """
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
+
+    id: Optional[str] = Field(default=None, alias="_id")
+    platform: Platform
+    platform_raw: Optional[str] = None
+    content_type: ContentType = ContentType.POST
+    content_type_raw: Optional[str] = None
+    pillar_or_campaign: str = ""
+    description: str = ""
+    week: Optional[int] = None
+    day: Optional[str] = None
+    date: Optional[str] = None
+    local_datetime: Optional[str] = Field(default=None, alias="datetime")
+    time: Optional[str] = None
+    due_at: Optional[datetime] = None
+    schedule_id: Optional[str] = None
+    user_uuid: Optional[str] = None
+    email: Optional[str] = None
+    status: Optional[str] = None
+    content: Optional[Dict[str, Any]] = None
+    content_fingerprint: Optional[str] = None
+    content_generated_at: Optional[datetime] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _fill_due_at(cls, data: Any) -> Any:
+        if isinstance(data, dict) and not data.get("due_at"):
+            due_at = parse_post_datetime(data)
+            if due_at is not None:
+                data = {**data, "due_at": due_at}
+        return data
+
+    @model_validator(mode="before")
+    @classmethod
+    def _keep_raw_labels(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            for field, enum_cls in (("platform", Platform), ("content_type", ContentType)):
+                raw = _unknown_label(enum_cls, data.get(field))
+                if raw and not data.get(f"{field}_raw"):
+                    logger.warning(f"Unknown {field} '{raw}', stored as {enum_cls.OTHER.value}")
+                    data = {**data, f"{field}_raw": raw}
+        return data
+
+    @field_validator("id", "schedule_id", mode="before")
+    @classmethod
+    def _stringify_id(cls, value: Any) -> Any:
+        return str(value) if isinstance(value, ObjectId) else value
+
+    @field_validator("due_at", "content_generated_at")
+    @classmethod
+    def _utc_due_at(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return _as_utc(value) if value is not None else None
+
+    @classmethod
+    def from_bson(cls, document: Dict) -> "Post":
+        """Build a post from a posts collection document."""
+        return cls.model_validate(document)
+
+    @classmethod
+    def from_json(cls, data: Any) -> "Post":
+        """Build a post from an API payload or LLM output, as a dict or JSON text."""
+        if isinstance(data, (str, bytes)):
+            return cls.model_validate_json(data)
+        return cls.model_validate(data)
+
+    def to_bson(self) -> Dict:
+        """Get the document stored in the posts collection."""
+        document = self.model_dump(by_alias=True, exclude_none=True)
+        document["platform"] = self.platform.value
+        document["content_type"] = self.content_type.value
+        if "_id" in document:
+            document["_id"] = _object_id(document["_id"])
+        if "schedule_id" in document:
+            document["schedule_id"] = _object_id(document["schedule_id"])
+        return document
+
+    def to_json(self) -> Dict:
+        """Get the JSON-safe dict returned by the API."""
+        return self.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+    @property
+    def platform_label(self) -> str:
+        """The platform as written, for prompts and decisions."""
+        return self.platform_raw or self.platform.value
+
+    @property
+    def content_type_label(self) -> str:
+        """The content type as written, for prompts and decisions."""
+        return self.content_type_raw or self.content_type.value
+
+    def input_fingerprint(self) -> str:
+        """Hash of the fields content is generated from, to detect stale content."""
+        return _input_fingerprint(self.platform_label, self.content_type_label,
+                                  self.pillar_or_campaign, self.description)
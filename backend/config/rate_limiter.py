@@ -0,0 +1,385 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+import threading
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Provider quotas shared by every process using the same backend; 0 disables a limit
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "1000"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "1000000"))
+# mongo (all processes using the database), file (processes on this host) or memory
+# (this process only: the API and the trigger would each spend the full quota)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "mongo")
+RATE_LIMIT_FILE = os.getenv(
+    "RATE_LIMIT_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rate_limit.json")
+)
+RATE_LIMIT_NAME = os.getenv("RATE_LIMIT_NAME", "llm")
+# Share of each quota that background callers leave for interactive ones
+RATE_LIMIT_BACKGROUND_RESERVE = float(os.getenv("RATE_LIMIT_BACKGROUND_RESERVE", "0.2"))
+# Output tokens assumed per call until the real usage is known
+LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", "1000"))
+# Longest a waiting caller sleeps before checking the buckets again
+RATE_LIMIT_MAX_POLL_SECONDS = float(os.getenv("RATE_LIMIT_MAX_POLL_SECONDS", "0.25"))
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+_default_priority = PRIORITY_INTERACTIVE if os.getenv("LLM_DEFAULT_PRIORITY", "interactive") == "interactive" \
+    else PRIORITY_BACKGROUND
+_in_limited_call: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_in_limited_call", default=False)
+
+def set_default_priority(priority: int) -> None:
+    """Set the priority of LLM calls in this process, e.g. background for the trigger."""
+    global _default_priority
+    _default_priority = priority
+
+def current_priority() -> int:
+    """Get the priority of LLM calls made from this process."""
+    return _default_priority
+
+def in_limited_call() -> bool:
+    """Whether the current context already holds a rate limit grant."""
+    return _in_limited_call.get()
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count at about four characters per token."""
+    return len(text) // 4 + 1
+
+def _refill(state: Dict[str, float], now: float, rpm: int, tpm: int) -> Dict[str, float]:
+    """Top up both buckets for the time since the state was last updated."""
+    elapsed = max(0.0, now - state["updated_at"])
+    return {
+        "requests": min(rpm, state["requests"] + elapsed * rpm / 60.0),
+        "tokens": min(tpm, state["tokens"] + elapsed * tpm / 60.0),
+        "updated_at": now
+    }
+
+def _take(state: Dict[str, float], tokens: int, reserve: float, rpm: int, tpm: int) -> float:
+    """Consume one request and some tokens from refilled state, or return the seconds to wait.
+
+    The state is changed in place only when the grant succeeds. A request
+    larger than the whole token quota is charged the whole quota.
+    """
+    need_requests = 1 + reserve * rpm
+    need_tokens = min(tokens, tpm) + reserve * tpm
+    wait = max(
+        (need_requests - state["requests"]) * 60.0 / rpm if rpm else 0.0,
+        (need_tokens - state["tokens"]) * 60.0 / tpm if tpm else 0.0
+    )
+    if wait > 0:
+        return wait
+    state["requests"] -= 1
+    state["tokens"] -= min(tokens, tpm)
+    return 0.0
+
+# Each store is safe to call from several threads at once. in_process
+# stores do no I/O, so async callers use them directly on the event loop.
+
+class MemoryBucketStore:
+    """Bucket state held in this process."""
+
+    in_process = True
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._state = {"requests": float(rpm), "tokens": float(tpm), "updated_at": time.time()}
+        self._lock = threading.Lock()
+
+    def take(self, tokens: int, reserve: float) -> float:
+        with self._lock:
+            self._state = _refill(self._state, time.time(), self.rpm, self.tpm)
+            return _take(self._state, tokens, reserve, self.rpm, self.tpm)
+
+    def adjust(self, tokens: int) -> None:
+        with self._lock:
+            self._state["tokens"] = max(-self.tpm, self._state["tokens"] - tokens)
+
+class FileBucketStore:
+    """Bucket state in a JSON file, locked with flock, shared by processes on one host."""
+
+    in_process = False
+
+    def __init__(self, rpm: int, tpm: int, path: str = RATE_LIMIT_FILE):
+        import fcntl  # Unix only
+        self._fcntl = fcntl
+        self.rpm = rpm
+        self.tpm = tpm
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, float]]:
+        with open(self.path, "a+") as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read())
+                except ValueError:
+                    state = {"requests": float(self.rpm), "tokens": float(self.tpm), "updated_at": time.time()}
+                state = _refill(state, time.time(), self.rpm, self.tpm)
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+
+    def take(self, tokens: int, reserve: float) -> float:
+        with self._locked_state() as state:
+            return _take(state, tokens, reserve, self.rpm, self.tpm)
+
+    def adjust(self, tokens: int) -> None:
+        with self._locked_state() as state:
+            state["tokens"] = max(-self.tpm, state["tokens"] - tokens)
+
+class MongoBucketStore:
+    """Bucket state in the rate_limits collection, shared by every process using the database.
+
+    Updates use optimistic concurrency on a version field, so concurrent
+    processes never both spend the same capacity.
+    """
+
+    in_process = False
+
+    def __init__(self, rpm: int, tpm: int, name: str = RATE_LIMIT_NAME):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.name = name
+
+    def _update(self, change) -> Any:
+        from pymongo.errors import DuplicateKeyError
+        from config.database import get_db
+        collection = get_db().rate_limits
+        while True:
+            document = collection.find_one({"_id": self.name})
+            if document is None:
+                try:
+                    collection.insert_one({"_id": self.name, "requests": float(self.rpm), "tokens": float(self.tpm),
+                                           "updated_at": time.time(), "version": 0})
+                except DuplicateKeyError:
+                    pass
+                continue
+            state = _refill(document, time.time(), self.rpm, self.tpm)
+            result = change(state)
+            if result:
+                # Nothing to write while the caller has to wait
+                return result
+            updated = collection.update_one(
+                {"_id": self.name, "version": document["version"]},
+                {"$set": {**state, "version": document["version"] + 1}}
+            )
+            if updated.modified_count:
+                return result
+
+    def take(self, tokens: int, reserve: float) -> float:
+        return self._update(lambda state: _take(state, tokens, reserve, self.rpm, self.tpm))
+
+    def adjust(self, tokens: int) -> None:
+        def change(state):
+            state["tokens"] = max(-self.tpm, state["tokens"] - tokens)
+            return 0.0
+        self._update(change)
+
+class RateLimiter:
+    """Request and token quota limiter shared by threads and asyncio tasks.
+
+    Callers queue by priority and then arrival; only the caller at the head
+    of this process's queue may take capacity, so interactive calls are
+    never stuck behind queued background ones. The queue is per process:
+    the shared store serves the heads of each process's queue in whatever
+    order they ask, so priority only holds across processes through
+    RATE_LIMIT_BACKGROUND_RESERVE, the share of each quota that background
+    callers leave untouched. The store is called without holding the
+    queue lock, and from a worker thread in async callers, so file or
+    database round-trips never block other waiters or the event loop.
+    """
+
+    def __init__(self, rpm: int = LLM_RPM_LIMIT, tpm: int = LLM_TPM_LIMIT, store: Any = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.enabled = bool(rpm or tpm)
+        self.store = store or MemoryBucketStore(rpm, tpm)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._granted: Dict[int, int] = {}
+        self._wait_seconds: Dict[int, float] = {}
+
+    def _enqueue(self, priority: int) -> tuple:
+        ticket = (priority, next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: tuple) -> None:
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+            self._changed.notify_all()
+
+    def _is_head(self, ticket: tuple) -> bool:
+        with self._lock:
+            return self._waiters[0] == ticket
+
+    def _attempt(self, ticket: tuple, tokens: int) -> float:
+        """Try to take capacity for a queued ticket; returns 0 on success or seconds to wait."""
+        if not self._is_head(ticket):
+            return RATE_LIMIT_MAX_POLL_SECONDS
+        reserve = RATE_LIMIT_BACKGROUND_RESERVE if ticket[0] >= PRIORITY_BACKGROUND else 0.0
+        wait = self.store.take(tokens, reserve)
+        if wait == 0:
+            self._dequeue(ticket)
+        return wait
+
+    def _record(self, priority: int, waited: float) -> None:
+        with self._lock:
+            self._granted[priority] = self._granted.get(priority, 0) + 1
+            self._wait_seconds[priority] = self._wait_seconds.get(priority, 0.0) + waited
+
+    def acquire(self, tokens: int, priority: Optional[int] = None) -> None:
+        """Block until one request and tokens are available."""
+        if not self.enabled:
+            return
+        priority = current_priority() if priority is None else priority
+        started = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._attempt(ticket, tokens)
+                if wait == 0:
+                    break
+                with self._changed:
+                    self._changed.wait(min(wait, RATE_LIMIT_MAX_POLL_SECONDS))
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        self._record(priority, time.monotonic() - started)
+
+    async def acquire_async(self, tokens: int, priority: Optional[int] = None) -> None:
+        """Wait without blocking the event loop until one request and tokens are available."""
+        if not self.enabled:
+            return
+        priority = current_priority() if priority is None else priority
+        started = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                if self.store.in_process or not self._is_head(ticket):
+                    wait = self._attempt(ticket, tokens)
+                else:
+                    wait = await asyncio.to_thread(self._attempt, ticket, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(min(wait, RATE_LIMIT_MAX_POLL_SECONDS))
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        self._record(priority, time.monotonic() - started)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token bucket once a call's real usage is known."""
+        if not self.enabled or not actual or actual == estimated:
+            return
+        self.store.adjust(actual - estimated)
+
+    async def asettle(self, estimated: int, actual: Optional[int]) -> None:
+        """Async version of settle."""
+        if self.store.in_process:
+            self.settle(estimated, actual)
+        else:
+            await asyncio.to_thread(self.settle, estimated, actual)
+
+    def queued(self) -> int:
+        """Number of callers in this process waiting for capacity."""
+        with self._lock:
+            return len(self._waiters)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "backend": type(self.store).__name__,
+                "queued": len(self._waiters),
+                "granted": {str(p): n for p, n in self._granted.items()},
+                "avg_wait_seconds": {str(p): self._wait_seconds[p] / n for p, n in self._granted.items()}
+            }
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide limiter for the configured backend."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                backend = RATE_LIMIT_BACKEND.lower()
+                if backend == "memory":
+                    logger.warning("RATE_LIMIT_BACKEND=memory: the quota is not shared with other processes, "
+                                   "so running the API and the trigger together can exceed it")
+                    store = MemoryBucketStore(LLM_RPM_LIMIT, LLM_TPM_LIMIT)
+                elif backend == "file":
+                    store = FileBucketStore(LLM_RPM_LIMIT, LLM_TPM_LIMIT)
+                elif backend == "mongo":
+                    store = MongoBucketStore(LLM_RPM_LIMIT, LLM_TPM_LIMIT)
+                else:
+                    raise ValueError(f"Unknown rate limit backend: {RATE_LIMIT_BACKEND}")
+                _limiter = RateLimiter(LLM_RPM_LIMIT, LLM_TPM_LIMIT, store)
+                logger.info(f"Rate limiting LLM calls to {LLM_RPM_LIMIT} RPM / {LLM_TPM_LIMIT} TPM ({backend})")
+    return _limiter
+
+class _Grant:
+    """Handle for settling a granted call's token usage."""
+
+    def __init__(self, limiter: RateLimiter, estimated: int):
+        self.limiter = limiter
+        self.estimated = estimated
+
+    def settle(self, actual: Optional[int]) -> None:
+        self.limiter.settle(self.estimated, actual)
+
+    async def asettle(self, actual: Optional[int]) -> None:
+        await self.limiter.asettle(self.estimated, actual)
+
+@contextmanager
+def rate_limited(tokens: int) -> Iterator[_Grant]:
+    """Hold a rate limit grant for the LLM call made inside the block."""
+    limiter = get_rate_limiter()
+    limiter.acquire(tokens)
+    marker = _in_limited_call.set(True)
+    try:
+        yield _Grant(limiter, tokens)
+    finally:
+        _in_limited_call.reset(marker)
+
+@asynccontextmanager
+async def arate_limited(tokens: int) -> AsyncIterator[_Grant]:
+    """Async version of rate_limited."""
+    limiter = get_rate_limiter()
+    await limiter.acquire_async(tokens)
+    marker = _in_limited_call.set(True)
+    try:
+        yield _Grant(limiter, tokens)
+    finally:
+        _in_limited_call.reset(marker)
+
+def get_rate_limiter_stats() -> Dict[str, Any]:
+    """Get queue and grant counters of the process-wide limiter."""
+    return get_rate_limiter().stats()
@@ -0,0 +1,308 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Attempts per call, including the first
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "20"))
+# Total time allowed for a call and its retries
+LLM_CALL_DEADLINE_SECONDS = float(os.getenv("LLM_CALL_DEADLINE_SECONDS", "180"))
+# Consecutive provider failures that open the breaker, and how long it stays open
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+# Provider and transport errors worth retrying, by class name so that
+# LiteLLM, OpenAI and httpx exceptions are recognised without importing them
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError",
+    "APIConnectionError",
+    "APITimeoutError",
+    "Timeout",
+    "TimeoutException",
+    "ServiceUnavailableError",
+    "InternalServerError",
+    "ConnectError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+}
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM provider unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call and its retries did not finish within the deadline."""
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is a transient provider or network failure."""
+    if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+def backoff_seconds(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number attempt (0-based)."""
+    return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+class CircuitBreaker:
+    """Fails calls fast after repeated provider failures.
+
+    After failure_threshold consecutive retryable failures the breaker
+    opens and rejects calls for reset_seconds. It then lets a single probe
+    call through; success closes it again, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(max(remaining, 1.0))
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.opens += 1
+                    logger.warning(f"LLM circuit breaker opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another probe through after one ended without a provider verdict."""
+        with self._lock:
+            self._probing = False
+
+class ResilienceStats:
+    """Thread-safe counters of calls, retries and failures."""
+
+    FIELDS = ("calls", "successes", "failures", "retries", "short_circuited", "deadline_exceeded")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {name: 0 for name in self.FIELDS}
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+breaker = CircuitBreaker()
+stats = ResilienceStats()
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        stats.record("deadline_exceeded")
+        raise DeadlineExceededError("LLM call deadline exceeded")
+    return remaining
+
+def _before_attempt() -> None:
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        stats.record("short_circuited")
+        raise
+
+def _after_failure(error: Exception, attempt: int, deadline: float) -> float:
+    """Record a failed attempt and return the backoff before the next one, or re-raise."""
+    if not is_retryable(error):
+        # The provider answered; the request itself was bad
+        breaker.release_probe()
+        stats.record("failures")
+        raise error
+    breaker.record_failure()
+    if attempt + 1 >= LLM_RETRY_ATTEMPTS or breaker.state == "open":
+        stats.record("failures")
+        raise error
+    delay = backoff_seconds(attempt)
+    if time.monotonic() + delay >= deadline:
+        stats.record("failures")
+        stats.record("deadline_exceeded")
+        raise DeadlineExceededError(f"LLM call deadline exceeded after {attempt + 1} attempts: {str(error)}") from error
+    stats.record("retries")
+    logger.warning(f"Retrying LLM call in {delay:.1f}s after {type(error).__name__}: {str(error)}")
+    return delay
+
+def call_with_resilience(fn: Callable[[float], Any], deadline_seconds: float = LLM_CALL_DEADLINE_SECONDS) -> Any:
+    """Call fn(timeout) with retries, backoff, the circuit breaker and a deadline.
+
+    fn receives the seconds left before the deadline and should use them as
+    its request timeout, since a blocking call cannot be interrupted. An
+    attempt that ends without a success or a provider failure (a deadline,
+    an interrupt) releases the breaker's probe slot, so an abandoned probe
+    never leaves the breaker half-open.
+    """
+    stats.record("calls")
+    deadline = time.monotonic() + deadline_seconds
+    for attempt in range(LLM_RETRY_ATTEMPTS):
+        _before_attempt()
+        settled = False
+        try:
+            result = fn(_remaining(deadline))
+            breaker.record_success()
+            settled = True
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            settled = True
+            delay = _after_failure(e, attempt, deadline)
+        else:
+            stats.record("successes")
+            return result
+        finally:
+            if not settled:
+                breaker.release_probe()
+        time.sleep(delay)
+
+async def acall_with_resilience(fn: Callable[[float], Awaitable[Any]],
+                                deadline_seconds: float = LLM_CALL_DEADLINE_SECONDS) -> Any:
+    """Async version of call_with_resilience; each attempt is also cancelled at the deadline."""
+    stats.record("calls")
+    deadline = time.monotonic() + deadline_seconds
+    for attempt in range(LLM_RETRY_ATTEMPTS):
+        _before_attempt()
+        settled = False
+        try:
+            remaining = _remaining(deadline)
+            result = await asyncio.wait_for(fn(remaining), timeout=remaining)
+            breaker.record_success()
+            settled = True
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            settled = True
+            delay = _after_failure(e, attempt, deadline)
+        else:
+            stats.record("successes")
+            return result
+        finally:
+            if not settled:
+                breaker.release_probe()
+        await asyncio.sleep(delay)
+
+def _stream_failure(error: Exception) -> None:
+    """Record a stream that failed after its first item; it cannot be retried."""
+    if is_retryable(error):
+        breaker.record_failure()
+    else:
+        breaker.release_probe()
+    stats.record("failures")
+
+def iter_with_resilience(factory: Callable[[float], Iterator[Any]],
+                         deadline_seconds: float = LLM_CALL_DEADLINE_SECONDS) -> Iterator[Any]:
+    """Stream from factory(timeout), retrying only failures before the first item.
+
+    A stream closed early by its consumer, e.g. a disconnected client,
+    releases the breaker's probe slot without counting as a failure.
+    """
+    stats.record("calls")
+    deadline = time.monotonic() + deadline_seconds
+    for attempt in range(LLM_RETRY_ATTEMPTS):
+        _before_attempt()
+        started = False
+        settled = False
+        try:
+            for item in factory(_remaining(deadline)):
+                started = True
+                yield item
+            breaker.record_success()
+            settled = True
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            settled = True
+            if started:
+                _stream_failure(e)
+                raise
+            delay = _after_failure(e, attempt, deadline)
+        else:
+            stats.record("successes")
+            return
+        finally:
+            if not settled:
+                breaker.release_probe()
+        time.sleep(delay)
+
+async def aiter_with_resilience(factory: Callable[[float], AsyncIterator[Any]],
+                                deadline_seconds: float = LLM_CALL_DEADLINE_SECONDS) -> AsyncIterator[Any]:
+    """Async version of iter_with_resilience."""
+    stats.record("calls")
+    deadline = time.monotonic() + deadline_seconds
+    for attempt in range(LLM_RETRY_ATTEMPTS):
+        _before_attempt()
+        started = False
+        settled = False
+        try:
+            async for item in factory(_remaining(deadline)):
+                started = True
+                yield item
+            breaker.record_success()
+            settled = True
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            settled = True
+            if started:
+                _stream_failure(e)
+                raise
+            delay = _after_failure(e, attempt, deadline)
+        else:
+            stats.record("successes")
+            return
+        finally:
+            if not settled:
+                breaker.release_probe()
+        await asyncio.sleep(delay)
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """Get call counters and the circuit breaker state."""
+    return {**stats.as_dict(), "breaker_state": breaker.state, "breaker_opens": breaker.opens}
@@ -0,0 +1,154 @@
+import os
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from dotenv import load_dotenv
+
+from config.metrics import percentile
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Models behind each tier; standard is the gateway's default model, and
+# strong uses it too unless a stronger model is configured
+LLM_MODEL_FAST = os.getenv("LLM_MODEL_FAST", "gemini/gemini-2.0-flash-lite")
+LLM_MODEL_STANDARD = os.getenv("LLM_MODEL", "gemini/gemini-2.0-flash")
+LLM_MODEL_STRONG = os.getenv("LLM_MODEL_STRONG") or LLM_MODEL_STANDARD
+# Model name prefixes of thinking models, whose reasoning counts against
+# max_tokens, and the tokens added to a route's max_tokens on them
+LLM_THINKING_MODELS = [prefix.strip() for prefix in os.getenv("LLM_THINKING_MODELS", "gemini-2.5,o1,o3,o4").split(",")
+                       if prefix.strip()]
+LLM_THINKING_TOKENS = int(os.getenv("LLM_THINKING_TOKENS", "16384"))
+# JSON overrides of the routing table, e.g. {"decider": {"tier": "standard"}}
+LLM_ROUTES = os.getenv("LLM_ROUTES")
+# Recent calls per route kept for latency percentiles
+LLM_ROUTE_LATENCY_WINDOW = int(os.getenv("LLM_ROUTE_LATENCY_WINDOW", "500"))
+
+MODEL_TIERS = {
+    "fast": LLM_MODEL_FAST,
+    "standard": LLM_MODEL_STANDARD,
+    "strong": LLM_MODEL_STRONG,
+}
+
+# Model tier and generation settings per call site
+DEFAULT_ROUTES: Dict[str, Dict[str, Any]] = {
+    # Post type classification in the trigger: a short list of labels
+    "decider": {"tier": "fast", "max_tokens": 32, "temperature": 0.0},
+    # Content type, pillar and description for each slot of a calendar chunk
+    "scheduler": {"tier": "standard", "max_tokens": 4096, "temperature": 0.4},
+    # Full content strategy during setup
+    "strategy": {"tier": "strong", "max_tokens": 4096, "temperature": 0.7},
+    # Setup crew agent: calls the strategy tool and hands back its strategy
+    "strategy_agent": {"tier": "standard", "max_tokens": 4096, "temperature": 0.2},
+    # Caption, hashtags and visual description of one post
+    "copy": {"tier": "standard", "max_tokens": 1024, "temperature": 0.8},
+    # Many posts per call; must cover TEXT_BATCH_MAX_OUTPUT_TOKENS
+    "copy_batch": {"tier": "standard", "max_tokens": 8192, "temperature": 0.8},
+    # Image concept and description for visual posts
+    "image_description": {"tier": "standard", "max_tokens": 1024, "temperature": 0.7},
+}
+
+def _load_routes() -> Dict[str, Dict[str, Any]]:
+    """Merge the LLM_ROUTES overrides into the default routing table."""
+    routes = {name: dict(settings) for name, settings in DEFAULT_ROUTES.items()}
+    if LLM_ROUTES:
+        try:
+            overrides = json.loads(LLM_ROUTES)
+        except ValueError as e:
+            raise ValueError(f"Invalid LLM_ROUTES: {str(e)}")
+        for name, settings in overrides.items():
+            routes.setdefault(name, {"tier": "standard"}).update(settings)
+    for name, settings in routes.items():
+        if settings.get("tier") not in MODEL_TIERS and not settings.get("model"):
+            raise ValueError(f"Unknown model tier for route {name}: {settings.get('tier')}")
+    return routes
+
+ROUTES = _load_routes()
+
+def is_thinking_model(model: str) -> bool:
+    """Whether a model spends output tokens on reasoning before it answers."""
+    name = model.split("/")[-1]
+    return any(name.startswith(prefix) for prefix in LLM_THINKING_MODELS)
+
+def route_settings(route: str) -> Dict[str, Any]:
+    """Get the model and generation params of a route.
+
+    A route may name a model directly instead of a tier. On a thinking model
+    max_tokens is raised by LLM_THINKING_TOKENS, so reasoning does not use
+    up the budget meant for the answer. Returns the model and a dict of
+    params for get_llm.
+    """
+    if route not in ROUTES:
+        raise ValueError(f"Unknown LLM route: {route}")
+    settings = dict(ROUTES[route])
+    tier = settings.pop("tier", None)
+    model = settings.pop("model", None) or MODEL_TIERS[tier]
+    if settings.get("max_tokens") and is_thinking_model(model):
+        settings["max_tokens"] += LLM_THINKING_TOKENS
+    return {"model": model, "params": settings}
+
+class _RouteCounters:
+    def __init__(self, window: int):
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+class RouteStats:
+    """Call, token and latency counters per route, for tuning the routing table."""
+
+    def __init__(self, window: int = LLM_ROUTE_LATENCY_WINDOW):
+        self.window = window
+        self._routes: Dict[str, _RouteCounters] = {}
+        self._lock = threading.Lock()
+
+    def _counters(self, route: str) -> _RouteCounters:
+        counters = self._routes.get(route)
+        if counters is None:
+            counters = self._routes[route] = _RouteCounters(self.window)
+        return counters
+
+    def record(self, route: str, seconds: float, usage: Optional[Dict] = None) -> None:
+        with self._lock:
+            counters = self._counters(route)
+            counters.calls += 1
+            counters.latencies.append(seconds)
+            if usage:
+                counters.prompt_tokens += usage.get("prompt_tokens") or 0
+                counters.completion_tokens += usage.get("completion_tokens") or 0
+
+    def record_failure(self, route: str) -> None:
+        with self._lock:
+            counters = self._counters(route)
+            counters.calls += 1
+            counters.failures += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for route, counters in self._routes.items():
+                succeeded = counters.calls - counters.failures
+                result[route] = {
+                    "model": route_settings(route)["model"] if route in ROUTES else None,
+                    "calls": counters.calls,
+                    "failures": counters.failures,
+                    "prompt_tokens": counters.prompt_tokens,
+                    "completion_tokens": counters.completion_tokens,
+                    "avg_completion_tokens": counters.completion_tokens / succeeded if succeeded else 0.0,
+                    "p50_seconds": percentile(counters.latencies, 50),
+                    "p95_seconds": percentile(counters.latencies, 95),
+                }
+            return result
+
+route_stats = RouteStats()
+
+def get_route_stats() -> Dict[str, Dict[str, Any]]:
+    """Get call, token and latency counters per route."""
+    return route_stats.stats()
@@ -0,0 +1,175 @@
+import re
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from config.models import ContentType, Post
+from config.timeutils import resolve_timezone, DEFAULT_TIMEZONE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_PERIOD_DAYS = 14
+DEFAULT_FREQUENCY = "3 times per week"
+
+# Posting times used when no preferred slots are given for a platform
+DEFAULT_TIME_SLOTS: Dict[str, List[str]] = {
+    "instagram": ["11:00"],
+    "linkedin": ["14:00"],
+    "twitter": ["09:00"],
+    "x": ["09:00"],
+    "facebook": ["13:00"],
+    "tiktok": ["19:00"],
+    "youtube": ["15:00"],
+    "pinterest": ["20:00"],
+}
+FALLBACK_TIME_SLOTS = ["12:00"]
+
+# Weekdays (Monday=0) used for "N times per week", spread across the week
+WEEKLY_PATTERNS: Dict[int, List[int]] = {
+    1: [1],
+    2: [1, 3],
+    3: [0, 2, 4],
+    4: [0, 1, 3, 4],
+    5: [0, 1, 2, 3, 4],
+    6: [0, 1, 2, 3, 4, 5],
+    7: [0, 1, 2, 3, 4, 5, 6],
+}
+
+# Platforms recognised in strategy text when none are given explicitly
+KNOWN_PLATFORMS = {
+    "instagram": "Instagram",
+    "linkedin": "LinkedIn",
+    "twitter": "Twitter",
+    "facebook": "Facebook",
+    "tiktok": "TikTok",
+    "youtube": "YouTube",
+    "pinterest": "Pinterest",
+}
+DEFAULT_PLATFORMS = ["Instagram", "LinkedIn"]
+
+NUMBER_WORDS = {"once": 1, "twice": 2, "one": 1, "two": 2, "three": 3, "four": 4,
+                "five": 5, "six": 6, "seven": 7}
+
+def parse_time_period(text: Optional[str]) -> int:
+    """Convert "1 Week", "2 Weeks", "1 Month" or "10 days" into a number of days."""
+    match = re.match(r"\s*(\d+)?\s*(day|week|month)", (text or "").lower())
+    if not match:
+        logger.warning(f"Unrecognised time period '{text}', using {DEFAULT_TIME_PERIOD_DAYS} days")
+        return DEFAULT_TIME_PERIOD_DAYS
+    count = int(match.group(1) or 1)
+    return count * {"day": 1, "week": 7, "month": 30}[match.group(2)]
+
+def frequency_dates(frequency: Optional[str], start: date, days: int) -> List[date]:
+    """Expand a posting frequency into the posting dates of a period.
+
+    Understands "Daily", "Every other day", "Weekly" and "N times per week"
+    (also "N posts/week", "twice a week"). Unrecognised text falls back to
+    DEFAULT_FREQUENCY.
+    """
+    text = (frequency or DEFAULT_FREQUENCY).lower().strip()
+    period = [start + timedelta(days=offset) for offset in range(days)]
+
+    if text == "daily" or text.startswith("every day"):
+        return period
+    if text.startswith("every other day"):
+        return period[::2]
+    if text == "weekly" or text.startswith("once a week"):
+        per_week = 1
+    else:
+        match = re.match(r"(\d+|\w+)\s*(?:times?|posts?)?\s*(?:per|a|/|each)\s*week", text)
+        per_week = None
+        if match:
+            count = match.group(1)
+            per_week = int(count) if count.isdigit() else NUMBER_WORDS.get(count)
+        if not per_week:
+            logger.warning(f"Unrecognised post frequency '{frequency}', using {DEFAULT_FREQUENCY}")
+            return frequency_dates(DEFAULT_FREQUENCY, start, days)
+    weekdays = WEEKLY_PATTERNS[max(1, min(7, per_week))]
+    return [day for day in period if day.weekday() in weekdays]
+
+def detect_platforms(strategy_text: str) -> List[str]:
+    """Find the platforms a strategy mentions, in the order they first appear."""
+    text = (strategy_text or "").lower()
+    found = [(text.find(key), name) for key, name in KNOWN_PLATFORMS.items() if key in text]
+    return [name for _, name in sorted(found)] or list(DEFAULT_PLATFORMS)
+
+def parse_time_slot(value: str) -> time:
+    """Parse "14:00" or "2:00 PM" into a time of day."""
+    for fmt in ("%H:%M", "%I:%M %p", "%I %p"):
+        try:
+            return datetime.strptime(value.strip().upper(), fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time slot: {value}")
+
+def build_slots(platforms: List[str], time_period: Optional[str] = None, frequency: Optional[str] = None,
+                platform_frequencies: Optional[Dict[str, str]] = None,
+                time_slots: Optional[Dict[str, List[str]]] = None,
+                tz_name: Optional[str] = None, start: Optional[date] = None) -> List[Dict]:
+    """Expand per-platform frequencies and time slots into concrete posting slots.
+
+    Scheduling starts the day after start (today in the target timezone by
+    default) and covers time_period. Each platform uses its entry in
+    platform_frequencies, or frequency, and cycles through its preferred
+    time_slots, or DEFAULT_TIME_SLOTS. Slots are returned in time order with
+    the same date fields the planner has always stored.
+    """
+    zone = resolve_timezone(tz_name or DEFAULT_TIMEZONE)
+    first_day = (start or datetime.now(zone).date()) + timedelta(days=1)
+    days = parse_time_period(time_period)
+    platform_frequencies = {k.lower(): v for k, v in (platform_frequencies or {}).items()}
+    time_slots = {k.lower(): v for k, v in (time_slots or {}).items()}
+
+    slots = []
+    for platform in platforms:
+        key = platform.lower()
+        times = [parse_time_slot(t) for t in time_slots.get(key) or DEFAULT_TIME_SLOTS.get(key, FALLBACK_TIME_SLOTS)]
+        dates = frequency_dates(platform_frequencies.get(key, frequency), first_day, days)
+        for index, day in enumerate(dates):
+            local = datetime.combine(day, times[index % len(times)], tzinfo=zone)
+            slots.append({
+                "platform": platform,
+                "week": (day - first_day).days // 7 + 1,
+                "day": local.strftime("%A"),
+                "date": local.strftime("%Y-%m-%d"),
+                "datetime": f"{local.strftime('%Y-%m-%d %H:%M:%S')} {zone.key}",
+                "time": f"{local.strftime('%I:%M %p')} {local.tzname()}",
+                "_sort": local,
+            })
+    slots.sort(key=lambda slot: (slot["_sort"], slot["platform"]))
+    for slot in slots:
+        del slot["_sort"]
+    return slots
+
+def _slot_number(value: Any, default: int) -> int:
+    """The slot number an LLM item refers to, or default if it is missing or not a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def fill_slots(slots: List[Dict], items: List[Any]) -> List[Post]:
+    """Merge the LLM's per-slot content items into the slots, in slot order.
+
+    Items are matched by their "slot" number, or by position when it is
+    missing or not a number.
+    """
+    by_slot = {}
+    for position, item in enumerate(items, 1):
+        if isinstance(item, dict):
+            by_slot[_slot_number(item.get("slot"), position)] = item
+
+    posts = []
+    for index, slot in enumerate(slots, 1):
+        item = by_slot.get(index)
+        if item is None:
+            logger.warning("No content returned for slot %d (%s %s)", index, slot["platform"], slot["date"])
+            item = {}
+        posts.append(Post.from_json({
+            **slot,
+            "content_type": item.get("content_type") or ContentType.POST,
+            "pillar_or_campaign": str(item.get("pillar_or_campaign") or ""),
+            "description": str(item.get("description") or "")
+        }))
+    return posts
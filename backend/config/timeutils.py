@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# The LLM writes post times with US abbreviations such as "EST" year-round,
+# meaning local wall-clock time, so abbreviations map to IANA zones rather
+# than fixed offsets.
+TIMEZONE_ALIASES: Dict[str, str] = {
+    "EST": "America/New_York",
+    "EDT": "America/New_York",
+    "ET": "America/New_York",
+    "CST": "America/Chicago",
+    "CDT": "America/Chicago",
+    "CT": "America/Chicago",
+    "MST": "America/Denver",
+    "MDT": "America/Denver",
+    "MT": "America/Denver",
+    "PST": "America/Los_Angeles",
+    "PDT": "America/Los_Angeles",
+    "PT": "America/Los_Angeles",
+    "UTC": "UTC",
+    "GMT": "UTC",
+}
+
+DEFAULT_TIMEZONE = "America/New_York"
+
+DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d %I:%M %p",
+    "%Y-%m-%d %I:%M:%S %p",
+)
+
+def resolve_timezone(name: Optional[str]) -> ZoneInfo:
+    """Resolve a timezone abbreviation or IANA name, defaulting to Eastern."""
+    if not name:
+        return ZoneInfo(DEFAULT_TIMEZONE)
+    name = name.strip()
+    try:
+        return ZoneInfo(TIMEZONE_ALIASES.get(name.upper(), name))
+    except Exception:
+        logger.warning(f"Unknown timezone '{name}', using {DEFAULT_TIMEZONE}")
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+def parse_local_datetime(value: str) -> Optional[datetime]:
+    """Parse "2025-04-15 11:00:00 EST" style text into an aware UTC datetime."""
+    if not value or not isinstance(value, str):
+        return None
+    parts = value.strip().split()
+    tz_name = None
+    if len(parts) > 2 and parts[-1].upper() not in ("AM", "PM"):
+        tz_name = parts.pop()
+    text = " ".join(parts)
+    for fmt in DATETIME_FORMATS:
+        try:
+            local = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return local.replace(tzinfo=resolve_timezone(tz_name)).astimezone(timezone.utc)
+    return None
+
+def parse_post_datetime(post: Dict) -> Optional[datetime]:
+    """Get the UTC due time of a scheduled post.
+
+    Uses the post's "datetime" field and falls back to combining "date" and
+    "time" ("2025-04-15" + "11:00 AM EST"). Returns None if neither parses.
+    """
+    due_at = parse_local_datetime(post.get("datetime"))
+    if due_at is None and post.get("date") and post.get("time"):
+        due_at = parse_local_datetime(f"{post['date']} {post['time']}")
+    return due_at
@@ -0,0 +1,63 @@
+import os
+import sys
+import threading
+
+import mongomock
+import pytest
+
+# Import backend modules the way the services do, as config.X
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import database
+
+class SerializedDatabase:
+    """A mongomock database whose collection operations run one at a time.
+
+    mongomock is not thread-safe, while a MongoDB server applies each
+    operation atomically. Serializing the operations gives concurrent
+    workers the same guarantee, and lets them interleave between them.
+    After interleave(workers), every operation also waits until each worker
+    has reached its next one, so the workers' operations alternate one for
+    one, as if each ran between two operations of every other worker.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.RLock()
+        self._barrier = None
+
+    def interleave(self, workers):
+        """Run the next operations of that many workers in lock step, or stop with None."""
+        self._barrier = threading.Barrier(workers) if workers else None
+
+    def __getattr__(self, name):
+        return SerializedCollection(getattr(self._db, name), self._lock, self)
+
+    def __getitem__(self, name):
+        return SerializedCollection(self._db[name], self._lock, self)
+
+class SerializedCollection:
+    def __init__(self, collection, lock, database):
+        self._collection = collection
+        self._lock = lock
+        self._database = database
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            barrier = self._database._barrier
+            if barrier is not None:
+                barrier.wait(timeout=10)
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return call
+
+@pytest.fixture
+def db(monkeypatch):
+    """An in-memory database behind config.database."""
+    mock_db = SerializedDatabase(mongomock.MongoClient()[database.DB_NAME])
+    monkeypatch.setattr(database, "get_db", lambda: mock_db)
+    return mock_db
@@ -0,0 +1,158 @@
+import os
+import uuid
+import threading
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from config import database
+from config.database import (
+    POST_STATUS_CLAIMED,
+    POST_STATUS_PENDING,
+    POST_STATUS_PUBLISHED,
+    claim_due_post,
+    mark_post_status,
+    renew_post_lease,
+)
+
+NOW = datetime.now(timezone.utc)
+START = NOW - timedelta(hours=1)
+END = NOW + timedelta(minutes=1)
+
+def add_posts(db, count):
+    db.posts.insert_many([
+        {"status": POST_STATUS_PENDING, "due_at": START + timedelta(seconds=i), "platform": "LinkedIn"}
+        for i in range(count)
+    ])
+
+def run_worker(owner, published, barrier):
+    """Claim and publish posts until none are left, like one trigger process."""
+    barrier.wait()
+    while True:
+        doc = claim_due_post(owner, START, END, lease_seconds=300)
+        if doc is None:
+            return
+        if mark_post_status(doc["_id"], POST_STATUS_PUBLISHED, owner=owner):
+            published.append((owner, doc["_id"]))
+
+def test_concurrent_workers_publish_each_post_once(db):
+    add_posts(db, 200)
+    published = []
+    workers = 8
+    barrier = threading.Barrier(workers)
+    threads = [
+        threading.Thread(target=run_worker, args=(f"worker-{i}", published, barrier))
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [post_id for _, post_id in published]
+    assert len(ids) == 200
+    assert len(set(ids)) == 200
+    assert db.posts.count_documents({"status": POST_STATUS_PUBLISHED, "attempts": 1}) == 200
+    # The work was actually split between the workers
+    assert len({owner for owner, _ in published}) > 1
+
+def read_then_write_claim(owner):
+    """A claim split into a read and an update, which is not atomic."""
+    db = database.get_db()
+    doc = db.posts.find_one({"status": POST_STATUS_PENDING}, sort=[("due_at", 1)])
+    db.posts.update_one({"_id": doc["_id"]}, {"$set": {"status": POST_STATUS_CLAIMED, "claimed_by": owner}})
+    return doc
+
+def claim_in_lock_step(db, claim, workers=2):
+    """Run one claim per worker with their database operations in lock step."""
+    claimed = {}
+    db.interleave(workers)
+    threads = [
+        threading.Thread(target=lambda owner: claimed.__setitem__(owner, claim(owner)), args=(f"worker-{i}",))
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.interleave(None)
+    return claimed
+
+def test_lock_step_catches_a_read_then_write_claim(db):
+    # Both workers read before either updates, so both claim the same post
+    add_posts(db, 2)
+    claimed = claim_in_lock_step(db, read_then_write_claim)
+
+    assert claimed["worker-0"]["_id"] == claimed["worker-1"]["_id"]
+
+def test_claim_is_atomic_when_workers_run_in_lock_step(db):
+    add_posts(db, 2)
+    claimed = claim_in_lock_step(db, lambda owner: claim_due_post(owner, START, END, lease_seconds=300))
+
+    assert claimed["worker-0"]["_id"] != claimed["worker-1"]["_id"]
+    for owner, doc in claimed.items():
+        assert db.posts.find_one({"_id": doc["_id"]})["claimed_by"] == owner
+
+def run_worker_process(db_name, owner, barrier, results):
+    """run_worker in a separate process against the real database."""
+    database.DB_NAME = db_name
+    published = []
+    run_worker(owner, published, barrier)
+    results.put([str(post_id) for _, post_id in published])
+
+@pytest.mark.skipif(not os.environ.get("MONGO_URI"), reason="needs a MongoDB server in MONGO_URI")
+def test_worker_processes_publish_each_post_once_on_mongodb():
+    db_name = f"claims_test_{uuid.uuid4().hex}"
+    client = database.get_client()
+    db = client[db_name]
+    try:
+        add_posts(db, 200)
+        context = multiprocessing.get_context("spawn")
+        workers = 4
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = [
+            context.Process(target=run_worker_process, args=(db_name, f"worker-{i}", barrier, results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        published = [results.get(timeout=120) for _ in processes]
+        for process in processes:
+            process.join()
+
+        ids = [post_id for ids in published for post_id in ids]
+        assert len(ids) == 200
+        assert len(set(ids)) == 200
+        assert db.posts.count_documents({"status": POST_STATUS_PUBLISHED, "attempts": 1}) == 200
+    finally:
+        client.drop_database(db_name)
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it(db):
+    add_posts(db, 1)
+    first = claim_due_post("worker-a", START, END, lease_seconds=-1)
+    second = claim_due_post("worker-b", START, END, lease_seconds=300)
+
+    assert second["_id"] == first["_id"]
+    assert second["attempts"] == 2
+    assert not renew_post_lease(first["_id"], "worker-a", 300)
+    assert not mark_post_status(first["_id"], POST_STATUS_PUBLISHED, owner="worker-a")
+    assert mark_post_status(first["_id"], POST_STATUS_PUBLISHED, owner="worker-b")
+
+def test_renewed_lease_is_not_reclaimed(db):
+    add_posts(db, 1)
+    doc = claim_due_post("worker-a", START, END, lease_seconds=-1)
+
+    assert renew_post_lease(doc["_id"], "worker-a", 300)
+    assert claim_due_post("worker-b", START, END, lease_seconds=300) is None
+    stored = db.posts.find_one({"_id": doc["_id"]})
+    assert stored["status"] == POST_STATUS_CLAIMED
+    assert stored["claimed_by"] == "worker-a"
+
+def test_claims_only_posts_due_in_window(db):
+    add_posts(db, 1)
+    db.posts.insert_one({"status": POST_STATUS_PENDING, "due_at": END + timedelta(minutes=5)})
+
+    assert claim_due_post("worker-a", START, END) is not None
+    assert claim_due_post("worker-a", START, END) is None
@@ -0,0 +1,33 @@
+from datetime import date
+
+from config.scheduling import build_slots, fill_slots
+
+def make_slots(count):
+    return build_slots(["LinkedIn"], time_period=f"{count} days", frequency="Daily",
+                       tz_name="UTC", start=date(2025, 1, 5))
+
+def test_fill_slots_matches_items_by_slot_number():
+    slots = make_slots(2)
+    posts = fill_slots(slots, [
+        {"slot": 2, "description": "second"},
+        {"slot": "1", "description": "first"},
+    ])
+
+    assert [post.description for post in posts] == ["first", "second"]
+
+def test_fill_slots_falls_back_to_position_for_bad_slot_numbers():
+    slots = make_slots(3)
+    posts = fill_slots(slots, [
+        {"slot": None, "description": "first"},
+        {"slot": "two", "description": "second"},
+        {"description": "third"},
+    ])
+
+    assert [post.description for post in posts] == ["first", "second", "third"]
+
+def test_fill_slots_leaves_missing_slots_empty():
+    slots = make_slots(2)
+    posts = fill_slots(slots, [{"slot": 2, "description": "second"}, "not an item"])
+
+    assert [post.description for post in posts] == ["", "second"]
+    assert [post.due_at for post in posts] == sorted(post.due_at for post in posts)
@@ -1,4 +1,7 @@
+import json
+import time
 import requests
+from config import API_BASE_URL
 
 BASE_URL = "http://localhost:8000"  # Adjust to your FastAPI backend URL
 
@@ -6,3 +9,54 @@ def make_api_call(method, endpoint, data=None, files=None):
     url = f"http://localhost:8000{endpoint}"
     print(f"Calling API: {url}")
     return requests.post(url, data=data, files=files)
+
+# Seconds between job status polls
+JOB_POLL_INTERVAL = 2
+# Seconds to wait for a job before giving up on it
+JOB_MAX_WAIT = 1800
+# Seconds to wait for the next event on a stream before giving up
+STREAM_READ_TIMEOUT = 180
+
+def submit_job(kind, data):
+    """Queue a background job on the API and return it."""
+    response = requests.post(f"{API_BASE_URL}/jobs/{kind}", json=data, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def get_job(job_id):
+    """Get the current status of a background job."""
+    response = requests.get(f"{API_BASE_URL}/jobs/{job_id}", timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def wait_for_job(job_id, on_progress=None, poll_interval=JOB_POLL_INTERVAL, max_wait=JOB_MAX_WAIT):
+    """Poll a job until it succeeds or fails, reporting each status to on_progress.
+
+    Each poll is a short request, so no proxy timeout applies to the job as
+    a whole, and the job keeps running on the server if the page reloads.
+    Raises TimeoutError if the job has not finished after max_wait seconds.
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        job = get_job(job_id)
+        if on_progress:
+            on_progress(job)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Job {job_id} did not finish within {max_wait // 60} minutes")
+        time.sleep(poll_interval)
+
+def stream_events(endpoint, data, read_timeout=STREAM_READ_TIMEOUT):
+    """POST to a server-sent events endpoint and yield (event, data) pairs as they arrive."""
+    with requests.post(f"{API_BASE_URL}{endpoint}", json=data, stream=True, timeout=(10, read_timeout)) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+                event = "message"
@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import json
 from utils.session_manager import save_session, update_progress
+from components.utils import stream_events, wait_for_job
 from config import API_BASE_URL
 
 def render():
@@ -41,6 +42,12 @@ def render():
         
         return
     
+    # Resume a setup job that was still running when the page was left
+    if st.session_state.get("setup_job_id"):
+        st.info("Resuming your previous setup request...")
+        if run_setup_job(st.session_state.setup_job_id):
+            return
+    
     # Initialize progress tracking
     update_progress("setup", 0.1)
     
@@ -212,58 +219,119 @@ def render():
             "platforms": st.session_state.platforms
         }
         
-        try:
-            # Show spinner during API call
-            with st.spinner("🤖 AI is analyzing your brand and creating your strategy..."):
-                update_progress("setup", 0.95)
-                
-                # Make API request
-                response = requests.post(
-                    f"{API_BASE_URL}/setup",  # Changed from /process_setup to /setup
-                    json=setup_data,
-                    timeout=120  # Longer timeout for AI processing
-                )
-                
-                if response.status_code == 200:
-                    response_json = response.json()
-                    st.session_state.api_response = response_json
-                    
-                    # Store setup_id correctly - check different possible locations
-                    if "result" in response_json and "setup_id" in response_json["result"]:
-                        st.session_state.setup_id = response_json["result"]["setup_id"]
-                    elif "setup_id" in response_json:
-                        st.session_state.setup_id = response_json["setup_id"]
-                    else:
-                        # If setup_id is not in the expected location, search for it
-                        import json
-                        response_str = json.dumps(response_json)
-                        if "setup_id" in response_str:
-                            st.write("Debug: setup_id found in response but not in expected location")
-                            st.write(f"Debug: Full response: {response_json}")
-                    
-                    # Debug output
-                    st.write(f"Debug: Stored setup_id: {st.session_state.setup_id}")
-                    
-                    st.session_state.raw_content = response_json.get("result", {}).get("raw", "")
-                    
-                    # Mark setup as completed
-                    st.session_state.setup_completed = True
-                    update_progress("setup", 1.0)
-                    
-                    # Save session
+        update_progress("setup", 0.95)
+        run_setup_stream(setup_data)
+
+def run_setup_stream(setup_data):
+    """Stream the strategy from the API, rendering it as it is generated. Returns True on success.
+
+    The strategy is generated by a job on the server, so if the stream drops
+    the job is waited for instead, here or when the page is reopened.
+    """
+    placeholder = st.empty()
+    text = ""
+    response_json = None
+    try:
+        with st.spinner("🤖 AI is analyzing your brand and creating your strategy..."):
+            for event, data in stream_events("/setup/stream", setup_data):
+                if event == "start":
+                    st.session_state.setup_job_id = data["job_id"]
                     save_session()
-                    
-                    st.success("✨ Setup completed successfully! Here's your personalized strategy:")
-                    st.write(st.session_state.raw_content)
-                    
-                    # Navigation button
-                    col1, col2, col3 = st.columns([1, 1, 1])
-                    with col3:
-                        if st.button("➡️ Continue to Content Planning", key="navigate_button"):
-                            st.session_state.page = "Content Planner"
-                            save_session()
-                            st.rerun()
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
-        except Exception as e:
+                elif event == "token":
+                    text += data["text"]
+                    placeholder.markdown(text + "▌")
+                elif event == "done":
+                    response_json = data
+                elif event == "error":
+                    st.session_state.setup_job_id = None
+                    save_session()
+                    st.error(f"Error: {data.get('detail')}")
+                    return False
+    except Exception as e:
+        if not st.session_state.get("setup_job_id"):
             st.error(f"An error occurred: {str(e)}")
+            return False
+
+    if response_json is None:
+        if not st.session_state.get("setup_job_id"):
+            st.error("The connection closed before the strategy was completed. Please try again.")
+            return False
+        # The stream dropped, but the job keeps generating and storing the strategy
+        placeholder.empty()
+        st.info("The connection was interrupted. Waiting for your strategy to finish...")
+        return run_setup_job(st.session_state.setup_job_id)
+
+    st.session_state.setup_job_id = None
+    save_session()
+    placeholder.empty()
+    show_setup_result(response_json)
+    return True
+
+def run_setup_job(job_id):
+    """Wait for a setup job and show its result. Returns True on success."""
+    try:
+        # Show spinner while the job runs
+        with st.spinner("🤖 AI is analyzing your brand and creating your strategy..."):
+            progress_bar = st.progress(0.0, "Queued")
+            job = wait_for_job(
+                job_id,
+                on_progress=lambda job: progress_bar.progress(job["progress"], job.get("message") or "")
+            )
+    except TimeoutError as e:
+        # Stop resuming a job that never finishes
+        st.session_state.setup_job_id = None
+        save_session()
+        st.error(str(e))
+        return False
+    except Exception as e:
+        st.error(f"An error occurred: {str(e)}")
+        return False
+
+    st.session_state.setup_job_id = None
+    save_session()
+
+    if job["status"] != "succeeded":
+        st.error(f"Error: {job.get('error')}")
+        return False
+
+    show_setup_result(job["result"])
+    return True
+
+def show_setup_result(response_json):
+    """Store a completed setup response in the session and show the strategy."""
+    st.session_state.api_response = response_json
+    
+    # Store setup_id correctly - check different possible locations
+    if "result" in response_json and "setup_id" in response_json["result"]:
+        st.session_state.setup_id = response_json["result"]["setup_id"]
+    elif "setup_id" in response_json:
+        st.session_state.setup_id = response_json["setup_id"]
+    else:
+        # If setup_id is not in the expected location, search for it
+        response_str = json.dumps(response_json)
+        if "setup_id" in response_str:
+            st.write("Debug: setup_id found in response but not in expected location")
+            st.write(f"Debug: Full response: {response_json}")
+    
+    # Debug output
+    st.write(f"Debug: Stored setup_id: {st.session_state.setup_id}")
+    
+    st.session_state.raw_content = response_json.get("result", {}).get("raw", "")
+    
+    # Mark setup as completed
+    st.session_state.setup_completed = True
+    update_progress("setup", 1.0)
+    
+    # Save session
+    save_session()
+    
+    st.success("✨ Setup completed successfully! Here's your personalized strategy:")
+    st.write(st.session_state.raw_content)
+    
+    # Navigation button
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col3:
+        if st.button("➡️ Continue to Content Planning", key="navigate_button"):
+            st.session_state.page = "Content Planner"
+            save_session()
+            st.rerun()
@@ -4,6 +4,7 @@ import json
 import pandas as pd
 from datetime import datetime, timedelta
 from utils.session_manager import save_session, update_progress
+from components.utils import submit_job, wait_for_job
 from config import API_BASE_URL
 
 def render():
@@ -41,6 +42,12 @@ def render():
                 st.rerun()
         return
     
+    # Resume a content planner job that was still running when the page was left
+    if st.session_state.get("content_job_id"):
+        st.info("Resuming your previous content schedule request...")
+        if run_content_job(st.session_state.content_job_id):
+            return
+    
     # Initialize progress tracking
     update_progress("content_generation", 0.1)
     
@@ -89,48 +96,74 @@ def render():
     # Handle form submission
     if submit_button:
         try:
-            # Show spinner during API call
-            with st.spinner("🤖 AI is creating your content schedule..."):
-                update_progress("content_generation", 0.7)
-                
-                # Prepare data for API
-                content_data = {
-                    "email": st.session_state.email,
-                    "strategy": st.session_state.raw_content,
-                    "time_period": time_period,
-                    "post_frequency": post_frequency,
-                    "special_instructions": special_instructions
-                }
+            update_progress("content_generation", 0.7)
+            
+            # Prepare data for API
+            content_data = {
+                "email": st.session_state.email,
+                "strategy": st.session_state.raw_content,
+                "time_period": time_period,
+                "post_frequency": post_frequency,
+                "special_instructions": special_instructions,
+                "platforms": st.session_state.platforms or None
+            }
 
-                # Make API request
-                response = requests.post(
-                    f"{API_BASE_URL}/content_planner",
-                    json=content_data,
-                    timeout=180  # Longer timeout for content generation
-                )
-                
-                if response.status_code == 200:
-                    content_schedule = response.json()
-                    st.session_state.content_schedule = content_schedule
-                    st.session_state.schedule_id = content_schedule.get("schedule_id")
-                    
-                    update_progress("content_generation", 1.0)
-                    save_session()
-                    
-                    st.success("✨ Content schedule generated successfully!")
-                    display_content_schedule(content_schedule)
-                    
-                    # Navigation button
-                    col1, col2, col3 = st.columns([1, 1, 1])
-                    with col3:
-                        if st.button("➡️ Continue to Platform Credentials", key="navigate_button"):
-                            st.session_state.page = "Credentials"
-                            save_session()
-                            st.rerun()
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
+            # Queue schedule generation as a background job so a dropped
+            # connection or proxy timeout does not lose the work
+            job = submit_job("content_planner", content_data)
+            st.session_state.content_job_id = job["job_id"]
+            save_session()
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
+            return
+
+        run_content_job(st.session_state.content_job_id)
+
+def run_content_job(job_id):
+    """Wait for a content planner job and show its result. Returns True on success."""
+    try:
+        # Show spinner while the job runs
+        with st.spinner("🤖 AI is creating your content schedule..."):
+            progress_bar = st.progress(0.0, "Queued")
+            job = wait_for_job(
+                job_id,
+                on_progress=lambda job: progress_bar.progress(job["progress"], job.get("message") or "")
+            )
+    except TimeoutError as e:
+        # Stop resuming a job that never finishes
+        st.session_state.content_job_id = None
+        save_session()
+        st.error(str(e))
+        return False
+    except Exception as e:
+        st.error(f"An error occurred: {str(e)}")
+        return False
+
+    st.session_state.content_job_id = None
+    save_session()
+
+    if job["status"] != "succeeded":
+        st.error(f"Error: {job.get('error')}")
+        return False
+
+    content_schedule = job["result"]
+    st.session_state.content_schedule = content_schedule
+    st.session_state.schedule_id = content_schedule.get("schedule_id") if isinstance(content_schedule, dict) else None
+    
+    update_progress("content_generation", 1.0)
+    save_session()
+    
+    st.success("✨ Content schedule generated successfully!")
+    display_content_schedule(content_schedule)
+    
+    # Navigation button
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col3:
+        if st.button("➡️ Continue to Platform Credentials", key="navigate_button"):
+            st.session_state.page = "Credentials"
+            save_session()
+            st.rerun()
+    return True
 
 def display_content_schedule(content_schedule):
     """Display the content schedule in a user-friendly format."""
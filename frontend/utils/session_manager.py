@@ -26,7 +26,9 @@ def initialize_session():
         "goals": "",
         "target_audience": {},
         "platforms": [],
-        "api_response": None
+        "api_response": None,
+        "setup_job_id": None,
+        "content_job_id": None
     }
     
     # Initialize session state variables